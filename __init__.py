@@ -1,4 +1,5 @@
 import os
+import threading
 from distutils.util import strtobool
 
 from flask import Flask
@@ -7,6 +8,20 @@ from dotenv import load_dotenv
 from pymongo import MongoClient
 
 from interface.routes import pages
+from interface.api import api
+from interface.commands import register_commands
+from interface.libs.artifacts.store import ArtifactStore
+from interface.libs.artifacts.render import RenderPool
+from interface.libs.jobs.queue import QueueDepth
+from interface.libs.jobs.scheduler import Scheduler
+from interface.libs.processors.registry import ProcessorRegistry, file_source, mongo_source
+from interface.libs.database.indexes import ensure_indexes
+from interface.libs.email.outbox import Outbox
+from interface.libs.session.interface import ServerSideSessionInterface
+from interface.libs.session.store import MongoSessionStore, FileSessionStore, MemorySessionStore
+from interface.libs.user import cache as user_cache
+from interface.libs.quantum_functions import templates
+from interface.libs.simulation import execution, result_cache
 
 load_dotenv()
 
@@ -24,6 +39,7 @@ def create_app():
     app.config['MAIL_PASSWORD'] = os.environ.get("MAIL_PASSWORD")
     app.config['MAIL_USE_TLS'] = bool(strtobool(os.environ.get("MAIL_USE_TLS", 'True')))
     app.config['MAIL_USE_SSL'] = bool(strtobool(os.environ.get("MAIL_USE_SSL", 'False')))
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get("MAIL_DEFAULT_SENDER", os.environ.get("ADMIN-MAIL"))
     mail = Mail(app)
     mail.init_app(app)
     
@@ -34,9 +50,147 @@ def create_app():
     if not os.path.exists(upload_folder):
         os.makedirs(upload_folder)
     app.config['UPLOAD_FOLDER'] = UPLOAD_PATH
+
+    # Configure job-execution worker
+    # host of the links in mails sent by the worker, e.g. SERVER_NAME=saxonq.example.org
+    app.config["SERVER_NAME"] = os.environ.get("SERVER_NAME")
+    app.config["PREFERRED_URL_SCHEME"] = os.environ.get("PREFERRED_URL_SCHEME", "https")
+    app.config["WORKER_PROCESSES"] = int(os.environ.get("WORKER_PROCESSES", 2))
+    app.config["WORKER_POLL_INTERVAL"] = float(os.environ.get("WORKER_POLL_INTERVAL", 2))
+    app.config["WORKER_JOB_TIMEOUT"] = int(os.environ.get("WORKER_JOB_TIMEOUT", 300))
+
+    # Simulation engine, e.g. SIMULATION_ENGINES="Trick=aer,Tick=statevector"
+    app.config["SIMULATION_ENGINE"] = os.environ.get("SIMULATION_ENGINE", execution.STATEVECTOR)
+    app.config["SIMULATION_ENGINES"] = dict(entry.split("=", 1) for entry in
+                                            os.environ.get("SIMULATION_ENGINES", "").split(",") if entry)
+    execution.configure(app.config["SIMULATION_ENGINE"], app.config["SIMULATION_ENGINES"])
+    app.config["RESULT_CACHE_SIZE"] = int(os.environ.get("RESULT_CACHE_SIZE", 512))
+    app.config["RESULT_CACHE_TTL"] = float(os.environ.get("RESULT_CACHE_TTL", 3600))
+    result_cache.configure(maxsize=app.config["RESULT_CACHE_SIZE"],
+                           ttl=app.config["RESULT_CACHE_TTL"])
+
+    # Share memoized transpiler output between workers through mongodb
+    app.config["TRANSPILER_CACHE_SHARED"] = bool(strtobool(os.environ.get("TRANSPILER_CACHE_SHARED", 'False')))
+
+    # Seconds the per-processor queue depths are cached
+    app.config["QUEUE_DEPTH_TTL"] = float(os.environ.get("QUEUE_DEPTH_TTL", 5))
+    app.queue_depth = QueueDepth(app.config["QUEUE_DEPTH_TTL"])
+
+    # Fair-share scheduling of the open jobs
+    app.scheduler = Scheduler(user_quota=int(os.environ.get("SCHEDULER_USER_QUOTA", 20)),
+                              admin_priority=float(os.environ.get("SCHEDULER_ADMIN_PRIORITY", 600)),
+                              admin_share=float(os.environ.get("SCHEDULER_ADMIN_SHARE", 4)),
+                              aging=float(os.environ.get("SCHEDULER_AGING", 1.0)),
+                              usage_weight=float(os.environ.get("SCHEDULER_USAGE_WEIGHT", 60)),
+                              half_life=float(os.environ.get("SCHEDULER_HALF_LIFE", 3600)))
+
+    # Live job status: poll interval, long-poll and event stream timeouts in seconds.
+    # A long poll holds a sync worker for up to JOB_STATUS_TIMEOUT; raise it only
+    # with threaded or async workers (e.g. gunicorn --threads 8 or -k gevent)
+    app.config["JOB_STATUS_INTERVAL"] = float(os.environ.get("JOB_STATUS_INTERVAL", 1))
+    app.config["JOB_STATUS_TIMEOUT"] = float(os.environ.get("JOB_STATUS_TIMEOUT", 5))
+    # The event stream holds a server worker for the whole stream, so only enable
+    # it behind async workers (e.g. gunicorn -k gevent); clients long-poll otherwise
+    app.config["JOB_STATUS_STREAM"] = bool(strtobool(os.environ.get("JOB_STATUS_STREAM", 'False')))
+    app.config["JOB_STATUS_STREAM_TIMEOUT"] = float(os.environ.get("JOB_STATUS_STREAM_TIMEOUT", 60))
+
+    # Number of jobs per page in the job inspector
+    app.config["JOB_PAGE_SIZE"] = int(os.environ.get("JOB_PAGE_SIZE", 25))
+
+    # Job creator uploads (.qasm files or zip archives of them), parsed in memory
+    app.config["UPLOAD_MAX_FILE_BYTES"] = int(os.environ.get("UPLOAD_MAX_FILE_BYTES", 64*1024))
+    app.config["UPLOAD_MAX_BYTES"] = int(os.environ.get("UPLOAD_MAX_BYTES", 4*1024*1024))
+    # more files than the user quota are reported as not submitted, so take it as the default
+    app.config["UPLOAD_MAX_FILES"] = int(os.environ.get("UPLOAD_MAX_FILES", app.scheduler.user_quota or 100))
+
+    # JSON API: bearer token lifetime, circuits per request and their size, results per page
+    app.config["API_TOKEN_MAX_AGE"] = int(os.environ.get("API_TOKEN_MAX_AGE", 24*3600))
+    app.config["API_MAX_CIRCUITS"] = int(os.environ.get("API_MAX_CIRCUITS", app.scheduler.user_quota or 100))
+    app.config["API_MAX_CIRCUIT_BYTES"] = int(os.environ.get("API_MAX_CIRCUIT_BYTES", 64*1024))
+    app.config["API_MAX_PAGE_SIZE"] = int(os.environ.get("API_MAX_PAGE_SIZE", 100))
+
+    # Reject larger request bodies before they are read, with room for the multipart and JSON framing
+    app.config["MAX_CONTENT_LENGTH"] = max(app.config["UPLOAD_MAX_BYTES"],
+                                           app.config["API_MAX_CIRCUITS"]*app.config["API_MAX_CIRCUIT_BYTES"]) + 64*1024
+
+    # Configure shared store for rendered circuits and histograms
+    app.config["ARTIFACT_PATH"] = os.environ.get("ARTIFACT_PATH", os.getcwd() + '/artifacts')
+    app.config["ARTIFACT_MAX_BYTES"] = int(os.environ.get("ARTIFACT_MAX_BYTES", 256*1024*1024))
+    app.config["ARTIFACT_SWEEP_INTERVAL"] = int(os.environ.get("ARTIFACT_SWEEP_INTERVAL", 300))
+    app.config["ARTIFACT_SWEEPER"] = bool(strtobool(os.environ.get("ARTIFACT_SWEEPER", 'True')))
+    app.artifacts = ArtifactStore(app.config["ARTIFACT_PATH"],
+                                  app.config["ARTIFACT_MAX_BYTES"],
+                                  app.config["ARTIFACT_SWEEP_INTERVAL"])
+
+    # Configure pool of matplotlib render processes
+    app.config["RENDER_PROCESSES"] = int(os.environ.get("RENDER_PROCESSES", 2))
+    app.config["RENDER_TIMEOUT"] = float(os.environ.get("RENDER_TIMEOUT", 10))
+    app.config["RENDER_MAX_PENDING"] = int(os.environ.get("RENDER_MAX_PENDING", 8))
+    # start the pool (and import matplotlib and qiskit in it) now instead of at the first drawing
+    app.config["RENDER_PREWARM"] = bool(strtobool(os.environ.get("RENDER_PREWARM", 'False')))
+    app.renderer = RenderPool(app.config["RENDER_PROCESSES"],
+                              app.config["RENDER_TIMEOUT"],
+                              app.config["RENDER_MAX_PENDING"])
+    if app.config["RENDER_PREWARM"]:
+        app.renderer.start()
     
     # Connect database 
     client = MongoClient(app.config["MONGODB_URI"])    
     app.db = client.get_database('SaxonQ_Web')
+    if bool(strtobool(os.environ.get("DB_ENSURE_INDEXES", 'True'))):
+        ensure_indexes(app.db, app.logger)
+
+    # Available processors, from a JSON file or the processors collection
+    if os.environ.get("PROCESSORS_FILE"):
+        source = file_source(os.environ.get("PROCESSORS_FILE"))
+    else:
+        source = mongo_source(app.db.processors)
+    reload_interval = os.environ.get("PROCESSORS_RELOAD_INTERVAL")
+    app.processors = ProcessorRegistry(source,
+                                       float(reload_interval) if reload_interval else None)
+
+    # Keep sessions on the server, the cookie only carries the session id
+    # (SESSION_BACKEND: mongo, file, memory or cookie for Flask's signed cookie)
+    backend = os.environ.get("SESSION_BACKEND", "mongo")
+    lazy_keys = os.environ.get("SESSION_LAZY_KEYS", "QASM,instruction,processor").split(",")
+    if backend == "mongo":
+        app.session_interface = ServerSideSessionInterface(MongoSessionStore(app.db), lazy_keys)
+    elif backend == "file":
+        store = FileSessionStore(os.environ.get("SESSION_FILE_PATH", os.getcwd() + '/sessions'))
+        app.session_interface = ServerSideSessionInterface(store, lazy_keys)
+    elif backend == "memory":
+        app.session_interface = ServerSideSessionInterface(MemorySessionStore(), lazy_keys)
+    elif backend != "cookie":
+        raise ValueError("Unknown SESSION_BACKEND {!r}, use mongo, file, memory or cookie".format(backend))
+
+    # Deliver notification mails in the background; the sender runs in the web
+    # process and also delivers the mails queued by the worker
+    app.config["OUTBOX_SENDER"] = bool(strtobool(os.environ.get("OUTBOX_SENDER", 'True')))
+    app.outbox = Outbox(app,
+                        batch_size=int(os.environ.get("OUTBOX_BATCH_SIZE", 20)),
+                        max_attempts=int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5)),
+                        backoff=int(os.environ.get("OUTBOX_BACKOFF", 30)))
+
+    # Cache user documents between requests
+    user_cache.configure(maxsize=int(os.environ.get("USER_CACHE_SIZE", 4096)),
+                         ttl=float(os.environ.get("USER_CACHE_TTL", 60)))
+
+    # Prebuild the learning module sub-circuits in the background (imports qiskit)
+    if bool(strtobool(os.environ.get("TEMPLATE_WARMUP", 'False'))):
+        sizes = [p["number of qubits"] for p in app.processors.all()]
+        threading.Thread(target=templates.warm_up, args=(sizes,),
+                         name="template-warmup", daemon=True).start()
+
+    # Background threads only run in the web process: they are started by the
+    # first request, which CLI commands and the worker never serve
+    @app.before_request
+    def start_background_threads():
+        if app.config["ARTIFACT_SWEEPER"]:
+            app.artifacts.start_sweeper()
+        if app.config["OUTBOX_SENDER"]:
+            app.outbox.start_sender()
+
     app.register_blueprint(pages)
+    app.register_blueprint(api)
+    register_commands(app)
     return app
\ No newline at end of file
@@ -0,0 +1,181 @@
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from flask import (Blueprint, current_app, session, request, url_for, jsonify, abort, g)
+from werkzeug.exceptions import HTTPException
+from passlib.hash import pbkdf2_sha256
+import functools
+from dataclasses import asdict
+
+from interface.libs.user.cache import get_user_by_email
+from interface.libs.jobs.listing import processed_jobs_page
+from interface.libs.jobs.scheduler import QuotaExceeded
+from interface.libs.jobs.submission import build_jobs, submit_within_quota
+from interface.libs.jobs import status as job_status
+from interface.libs.jobs.documents import load as load_document
+from interface.model import Result
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+TOKEN_SALT = "api-token"
+
+
+def generate_api_token(email):
+    return URLSafeTimedSerializer(current_app.secret_key).dumps(email, salt=TOKEN_SALT)
+
+
+def api_user():
+    """User of a bearer token or of the session cookie, None if not logged in."""
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        serializer = URLSafeTimedSerializer(current_app.secret_key)
+        try:
+            email = serializer.loads(header[len("Bearer "):], salt=TOKEN_SALT,
+                                     max_age=current_app.config["API_TOKEN_MAX_AGE"])
+        except (BadSignature, SignatureExpired):
+            return None
+    else:
+        email = session.get("email")
+    if not email:
+        return None
+    return get_user_by_email(email)
+
+
+def api_login_required(route):
+    @functools.wraps(route)
+    def route_wrapper(*args, **kwargs):
+        user = api_user()
+        if user is None:
+            abort(401)
+        if not user.is_confirmed:
+            # the cache of this process may predate the confirmation
+            user = get_user_by_email(user.email, fresh=True)
+            if user is None or not user.is_confirmed:
+                abort(403)
+        g.user = user
+        return route(*args, **kwargs)
+    return route_wrapper
+
+
+@api.errorhandler(HTTPException)
+def http_error(error):
+    return jsonify({"error": error.name, "message": error.description}), error.code
+
+
+@api.errorhandler(QuotaExceeded)
+def quota_exceeded(error):
+    return jsonify({"error": "Too Many Requests", "message": str(error)}), 429
+
+
+def result_data(result):
+    data = asdict(result)
+    data["date_submit"] = result.date_submit.isoformat()
+    data["date_finish"] = result.date_finish.isoformat()
+    data["url"] = url_for(".result", _resultID=result._id)
+    return data
+
+
+@api.route("/token", methods=["POST"])
+def token():
+    """Exchange email and password for a bearer token."""
+    data = request.get_json(silent=True) or {}
+    user = get_user_by_email(data.get("email", ""), fresh=True)
+    if not user or not pbkdf2_sha256.verify(data.get("password", ""), user.password):
+        abort(401)
+    return jsonify({"token": generate_api_token(user.email),
+                    "expires_in": current_app.config["API_TOKEN_MAX_AGE"]})
+
+
+@api.route("/jobs", methods=["POST"])
+@api_login_required
+def submit():
+    """Submit many circuits to one processor.
+
+    Body: ``{"processor": "Trick", "circuits": ["OPENQASM 2.0; ...", {"name": "bell", "qasm": "..."}]}``.
+    Valid circuits are submitted, invalid ones are reported in ``errors``.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("circuits"), list):
+        abort(400, "Expected a JSON object with a list of circuits")
+    processor = current_app.processors.get(data.get("processor"))
+    if not processor:
+        abort(400, "Unknown processor")
+    if len(data["circuits"]) > current_app.config["API_MAX_CIRCUITS"]:
+        abort(413, "At most {} circuits per request".format(current_app.config["API_MAX_CIRCUITS"]))
+
+    circuits = []
+    errors = []
+    for index, circuit in enumerate(data["circuits"]):
+        if isinstance(circuit, dict):
+            circuit, name = circuit.get("qasm"), circuit.get("name", str(index))
+        else:
+            name = str(index)
+        if not isinstance(circuit, str):
+            errors.append({"circuit": name, "error": "expected a QASM string"})
+            continue
+        circuits.append((name, circuit))
+
+    jobs, invalid = build_jobs(g.user._id, processor, circuits,
+                               current_app.config["API_MAX_CIRCUIT_BYTES"], category="api")
+    jobs, over_quota = submit_within_quota(current_app.db, current_app.scheduler, jobs,
+                                           is_admin=g.user.is_admin)
+    errors += [{"circuit": name, "error": error} for name, error in invalid + over_quota]
+
+    submitted = [{"circuit": name,
+                  "id": job._id,
+                  "status_url": url_for(".job", _jobID=job._id)}
+                 for name, job in jobs]
+    return jsonify({"jobs": submitted, "errors": errors}), 201 if submitted else 400
+
+
+@api.route("/jobs/<string:_jobID>")
+@api_login_required
+def job(_jobID: str):
+    current = job_status.get(current_app.db, _jobID)
+    if current is None or (current.get("user_id") != g.user._id and not g.user.is_admin):
+        abort(404)
+    data = job_status.public(current)
+    if data.get("result_id"):
+        data["result_url"] = url_for(".result", _resultID=data["result_id"])
+    return jsonify(data)
+
+
+@api.route("/results")
+@api_login_required
+def results():
+    """Results of the user, newest first; pass ``next`` as ``after`` for the following page."""
+    size = min(request.args.get("size", current_app.config["JOB_PAGE_SIZE"], type=int),
+               current_app.config["API_MAX_PAGE_SIZE"])
+    try:
+        listings, next_cursor = processed_jobs_page(current_app.db, {"user_id": g.user._id},
+                                                    after=request.args.get("after"),
+                                                    size=max(size, 1))
+    except ValueError:
+        abort(400, "Invalid cursor")
+    return jsonify({"results": [{"id": listing._id,
+                                 "open_id": listing.open_id,
+                                 "processor": listing.processor["name"],
+                                 "category": listing.category,
+                                 "date_submit": listing.date_submit.isoformat(),
+                                 "date_finish": listing.date_finish.isoformat(),
+                                 "url": url_for(".result", _resultID=listing._id)}
+                                for listing in listings],
+                    "next": next_cursor})
+
+
+@api.route("/results/<string:_resultID>")
+@api_login_required
+def result(_resultID: str):
+    """A single result; results never change, so clients revalidate with If-None-Match."""
+    # check the ETag before the counts and instructions are loaded
+    header = current_app.db.processed_jobs.find_one({"_id": _resultID}, {"user_id": 1, "date_finish": 1})
+    if not header or (header["user_id"] != g.user._id and not g.user.is_admin):
+        abort(404)
+    etag = "{}-{}".format(_resultID, int(header["date_finish"].timestamp()))
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        result = load_document(Result, current_app.db.processed_jobs.find_one({"_id": _resultID}))
+        response = jsonify(result_data(result))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,93 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from interface.libs.jobs import worker, eta
+from interface.libs.jobs.migrations import backfill_instructions_verbose
+from interface.libs.database.indexes import ensure_indexes, missing_indexes, unused_indexes
+from interface.libs.startup import import_times, WEB_MODULES, HEAVY_MODULES
+from interface.libs.simulation import benchmark
+
+
+@click.command("worker")
+@click.option("--processes", type=int, default=None,
+              help="Size of the simulation process pool (default: WORKER_PROCESSES).")
+@with_appcontext
+def worker_command(processes):
+    """Run the job-execution worker that drains open_jobs."""
+    if not current_app.config["SERVER_NAME"]:
+        raise click.UsageError("Set SERVER_NAME so that the worker can link results in its mails.")
+    processors = [dict(p) for p in current_app.processors.all()]
+    worker.run(current_app._get_current_object(), processes, processors)
+
+
+@click.command("backfill-verbose")
+@with_appcontext
+def backfill_verbose_command():
+    """Store the verbose transpilation on existing open and processed jobs."""
+    for name in ("open_jobs", "processed_jobs"):
+        updated = backfill_instructions_verbose(current_app.db[name])
+        click.echo("{}: {} jobs updated".format(name, updated))
+
+
+@click.command("rebuild-queue-load")
+@with_appcontext
+def rebuild_queue_load_command():
+    """Recompute job costs and the queue sums behind the estimated waiting times."""
+    totals = eta.rebuild(current_app.db)
+    for name, seconds in totals.items():
+        click.echo("{}: {}".format(name, eta.format_duration(seconds)))
+
+
+@click.command("indexes")
+@click.option("--report", is_flag=True, help="Only report missing and unused indexes.")
+@with_appcontext
+def indexes_command(report):
+    """Create the database indexes and report missing or unused ones."""
+    if not report:
+        failed = ensure_indexes(current_app.db, current_app.logger)
+        click.echo("Indexes created" if not failed else "Failed: " + ", ".join(failed))
+    click.echo("Missing: " + (", ".join(missing_indexes(current_app.db)) or "none"))
+    click.echo("Unused: " + (", ".join(unused_indexes(current_app.db)) or "none"))
+
+
+@click.command("startup-report")
+def startup_report_command():
+    """Show how long the web modules and the deferred qiskit/matplotlib imports take."""
+    times = import_times(WEB_MODULES + HEAVY_MODULES)
+    for name, seconds in times.items():
+        deferred = " (deferred)" if name in HEAVY_MODULES else ""
+        click.echo("{:<24}{:>8.3f}s{}".format(name, seconds, deferred))
+    web = sum(times.get(name, 0) for name in WEB_MODULES)
+    click.echo("{:<24}{:>8.3f}s".format("web worker start-up", web))
+
+
+@click.command("benchmark-simulation")
+@click.option("--repeats", type=int, default=5)
+def benchmark_simulation_command(repeats):
+    """Compare the statevector engine with Aer on small circuits."""
+    click.echo("{:<18}{:>12}{:>14}  {}".format("circuit", "aer", "statevector", "same format"))
+    for row in benchmark.run(repeats):
+        click.echo("{:<18}{:>11.4f}s{:>13.4f}s  {}".format(row["circuit"], row["aer"],
+                                                           row["statevector"], row["same format"]))
+
+
+@click.command("benchmark-noise")
+@click.option("--batch", type=int, multiple=True, default=(1, 10, 50))
+@with_appcontext
+def benchmark_noise_command(batch):
+    """Show how building the noisy simulator is amortized over a batch of jobs."""
+    for processor in current_app.processors.all():
+        for row in benchmark.noise_amortization(processor, batch):
+            click.echo("{:<8} batch {:>4}: build {:.3f}s, {:.4f}s per job".format(
+                processor["name"], row["batch"], row["build"], row["per job"]))
+
+
+def register_commands(app):
+    app.cli.add_command(worker_command)
+    app.cli.add_command(backfill_verbose_command)
+    app.cli.add_command(rebuild_queue_load_command)
+    app.cli.add_command(indexes_command)
+    app.cli.add_command(startup_report_command)
+    app.cli.add_command(benchmark_simulation_command)
+    app.cli.add_command(benchmark_noise_command)
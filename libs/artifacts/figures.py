@@ -0,0 +1,42 @@
+from markupsafe import escape
+from flask import current_app
+from interface.libs.simulation.facade import QuantumCircuit
+
+from interface.libs.artifacts.store import circuit_key, histogram_key
+from interface.libs.artifacts.render import RenderUnavailable
+
+
+def _text_figure(text):
+    return '<pre class="text-figure">{}</pre>'.format(escape(text))
+
+
+def circuit_svg(qasm):
+    """Circuit drawing of an OpenQASM program.
+
+    Served from the artifact store when possible, otherwise drawn by the render
+    pool. Falls back to an (uncached) text drawing when the pool is busy.
+    """
+    key = circuit_key(qasm)
+    svg = current_app.artifacts.get(key)
+    if svg is None:
+        try:
+            svg = current_app.renderer.circuit(qasm)
+        except RenderUnavailable:
+            circuit = QuantumCircuit.from_qasm_str(qasm)
+            return _text_figure(str(circuit.draw(output='text')))
+        current_app.artifacts.put(key, svg)
+    return svg
+
+
+def histogram_svg(counts):
+    """Histogram of measurement counts, see ``circuit_svg``."""
+    key = histogram_key(counts)
+    svg = current_app.artifacts.get(key)
+    if svg is None:
+        try:
+            svg = current_app.renderer.histogram(counts)
+        except RenderUnavailable:
+            lines = ["{}: {}".format(state, count) for state, count in sorted(counts.items())]
+            return _text_figure("\n".join(lines))
+        current_app.artifacts.put(key, svg)
+    return svg
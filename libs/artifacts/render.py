@@ -0,0 +1,108 @@
+"""Out-of-process rendering of circuit drawings and histograms.
+
+matplotlib is slow and not thread-safe, so drawings are made by a pool of
+pre-warmed processes and returned as SVG text. Requests fail fast with
+``RenderUnavailable`` when the pool is overloaded or a render takes longer
+than ``timeout`` seconds; callers are expected to fall back to a plain-text
+drawing in that case. A render that times out is stuck in its process, so the
+pool is terminated and a fresh one is started by the next request.
+"""
+import threading
+import multiprocessing
+from io import StringIO
+
+
+class RenderUnavailable(Exception):
+    pass
+
+
+def _warm_up():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+    from qiskit import QuantumCircuit
+    from qiskit.visualization import plot_histogram
+    qc = QuantumCircuit(1, 1)
+    qc.measure(0, 0)
+    _svg(qc.draw(output='mpl'))
+
+
+def _svg(image, **kwargs):
+    import matplotlib.pyplot as plt
+    buffer = StringIO()
+    image.savefig(buffer, format="svg", **kwargs)
+    plt.close(image)
+    return buffer.getvalue()
+
+
+def render_circuit(qasm):
+    from qiskit import QuantumCircuit
+    circuit = QuantumCircuit.from_qasm_str(qasm)
+    return _svg(circuit.draw(output='mpl'))
+
+
+def render_histogram(counts):
+    from qiskit.visualization import plot_histogram
+    return _svg(plot_histogram(counts), bbox_inches="tight")
+
+
+class RenderPool:
+    def __init__(self, processes, timeout, max_pending=None):
+        self.processes = processes
+        self.timeout = timeout
+        self.max_pending = max_pending or 4*processes
+        self._pool = None
+        self._pending = 0
+        # bumped whenever the pool is recycled, callbacks of older pools are ignored
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _current_pool(self):
+        # called with the lock held
+        if self._pool is None:
+            context = multiprocessing.get_context("spawn")
+            self._pool = context.Pool(self.processes, initializer=_warm_up)
+        return self._pool
+
+    def start(self):
+        with self._lock:
+            self._current_pool()
+
+    def _recycle(self, generation):
+        """Terminate the pool of ``generation`` unless another request already did."""
+        with self._lock:
+            if generation != self._generation or self._pool is None:
+                return
+            pool, self._pool = self._pool, None
+            self._generation += 1
+            self._pending = 0
+        pool.terminate()
+
+    def _submit(self, function, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise RenderUnavailable("render pool overloaded")
+            pool, generation = self._current_pool(), self._generation
+            self._pending += 1
+
+        def done(_):
+            with self._lock:
+                if generation == self._generation:
+                    self._pending -= 1
+
+        try:
+            outcome = pool.apply_async(function, args, callback=done, error_callback=done)
+        except ValueError:
+            # terminated by a concurrent recycle, which also reset the pending count
+            raise RenderUnavailable("render pool restarting")
+        try:
+            return outcome.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            self._recycle(generation)
+            raise RenderUnavailable("render timed out after {}s".format(self.timeout))
+
+    def circuit(self, qasm):
+        return self._submit(render_circuit, qasm)
+
+    def histogram(self, counts):
+        return self._submit(render_histogram, counts)
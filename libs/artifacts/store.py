@@ -0,0 +1,106 @@
+"""Content-addressed store for rendered SVG artifacts.
+
+Circuit drawings and histograms are keyed by a hash of their normalized input,
+so identical circuits of different users share one file. The store is bounded
+in size: hits refresh the file's modification time and the sweeper deletes the
+least recently used files once ``max_bytes`` is exceeded.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+
+def normalize_qasm(qasm):
+    """Strip comments, blank lines and redundant whitespace from an OpenQASM program."""
+    lines = []
+    for line in qasm.splitlines():
+        line = line.split("//", 1)[0]
+        line = " ".join(line.split())
+        if line:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def circuit_key(qasm):
+    return "circuit-" + hashlib.sha256(normalize_qasm(qasm).encode()).hexdigest()
+
+
+def histogram_key(counts):
+    payload = json.dumps(counts, sort_keys=True)
+    return "histogram-" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ArtifactStore:
+    def __init__(self, root, max_bytes, sweep_interval=300):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+    def path(self, key):
+        return os.path.join(self.root, key + ".svg")
+
+    def get(self, key):
+        f_path = self.path(key)
+        try:
+            with open(f_path) as f:
+                svg = f.read()
+            # refresh for the LRU sweep
+            os.utime(f_path)
+        except FileNotFoundError:
+            # missing, or deleted by the sweeper in between
+            return None
+        return svg
+
+    def put(self, key, svg):
+        # write to a private file first so readers never see a partial svg
+        tmp_path = os.path.join(self.root, ".{}.{}.tmp".format(key, uuid.uuid4().hex))
+        with open(tmp_path, "w") as f:
+            f.write(svg)
+        os.replace(tmp_path, self.path(key))
+
+    def sweep(self):
+        """Delete least recently used artifacts until the store is below 90% of ``max_bytes``."""
+        entries = []
+        total = 0
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for _, size, f_path in sorted(entries):
+            if total <= 0.9*self.max_bytes:
+                break
+            try:
+                os.remove(f_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def start_sweeper(self):
+        def loop():
+            while True:
+                time.sleep(self.sweep_interval)
+                self.sweep()
+
+        with self._sweeper_lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=loop, name="artifact-sweeper", daemon=True)
+            self._sweeper.start()
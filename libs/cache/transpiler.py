@@ -0,0 +1,69 @@
+"""Memoized output of ``QASM_transpiler`` and ``QASM_Pulse_Transpiler``.
+
+Results are keyed by a hash of the transpiler kind and the instruction list.
+Lookups go to a process-wide LRU cache first and, if ``TRANSPILER_CACHE_SHARED``
+is set, to the ``transpiler_cache`` collection shared by all workers.
+"""
+import hashlib
+
+from flask import current_app, has_app_context
+
+from interface.libs.transpiler.Transpiler import QASM_transpiler, QASM_Pulse_Transpiler
+from interface.libs.cache.lru import LRUCache
+
+VERBOSE = "verbose"
+PULSE = "pulse"
+
+_transpilers = {VERBOSE: QASM_transpiler,
+                PULSE: QASM_Pulse_Transpiler}
+
+cache = LRUCache(maxsize=2048)
+shared_hits = 0
+
+
+def instruction_key(kind, instructions):
+    digest = hashlib.sha256("\n".join(instructions).encode()).hexdigest()
+    return "{}-{}".format(kind, digest)
+
+
+def _shared_collection():
+    if has_app_context() and current_app.config.get("TRANSPILER_CACHE_SHARED"):
+        return current_app.db.transpiler_cache
+    return None
+
+
+def transpile(instructions, kind=VERBOSE):
+    """Lines produced by the ``kind`` transpiler for ``instructions``."""
+    global shared_hits
+    key = instruction_key(kind, instructions)
+    lines = cache.get(key)
+    if lines is not None:
+        return list(lines)
+
+    collection = _shared_collection()
+    if collection is not None:
+        document = collection.find_one({"_id": key})
+        if document:
+            shared_hits += 1
+            cache.set(key, tuple(document["lines"]))
+            return list(document["lines"])
+
+    transpiler = _transpilers[kind](instructions)
+    transpiler.extract_instructions()
+    lines = transpiler.instruction.splitlines()
+    cache.set(key, tuple(lines))
+    if collection is not None:
+        collection.replace_one({"_id": key}, {"_id": key, "kind": kind, "lines": lines}, upsert=True)
+    return lines
+
+
+def verbose_instructions(instructions):
+    return transpile(instructions, VERBOSE)
+
+
+def pulse_instructions(instructions):
+    return transpile(instructions, PULSE)
+
+
+def stats():
+    return dict(cache.stats(), shared_hits=shared_hits)
@@ -0,0 +1,130 @@
+"""Circuit of the circuit creator, one document per user in ``circuits``.
+
+The document keeps the header lines and the gates as a list of
+``{"id", "pos", "line"}`` sorted by ``pos``. Appending, deleting and undoing
+are single array updates (``$push``/``$pull``) with the undo entry pushed in
+the same update, so an edit never rewrites or re-parses the program. The QASM
+text is joined only when it is needed for a drawing or a job; drawings are
+cached by the artifact store, so undoing back to an earlier circuit is not
+drawn again.
+"""
+import uuid
+import datetime
+
+from pymongo import ReturnDocument
+
+UNDO_DEPTH = 100
+
+_header_statements = ("OPENQASM", "include", "qreg", "creg")
+
+
+def new_header(num_qubits):
+    return ['OPENQASM 2.0;',
+            'include "qelib1.inc";',
+            'qreg q[{}];'.format(num_qubits),
+            'creg c[{}];'.format(num_qubits)]
+
+
+def split_program(lines):
+    """Header lines (version, includes, registers) and the remaining lines of a program."""
+    lines = [line for line in lines if line.strip()]
+    count = 0
+    while count < len(lines) and lines[count].strip().startswith(_header_statements):
+        count += 1
+    return lines[:count], lines[count:]
+
+
+def _gate(pos, line):
+    return {"id": uuid.uuid4().hex, "pos": pos, "line": line}
+
+
+class CircuitEditor:
+    def __init__(self, collection, owner):
+        self.collection = collection
+        self.owner = owner
+
+    def load(self):
+        return self.collection.find_one({"_id": self.owner})
+
+    def create(self, num_qubits, processor_name, lines=None):
+        """Start a new circuit, empty or from the lines of a program."""
+        if lines:
+            header, body = split_program(lines)
+        else:
+            header, body = new_header(num_qubits), []
+        circuit = {"_id": self.owner,
+                   "processor": processor_name,
+                   "num_qubits": num_qubits,
+                   "header": header,
+                   "gates": [_gate(pos, line) for pos, line in enumerate(body)],
+                   "next_pos": len(body),
+                   "undo": [],
+                   "updated": datetime.datetime.today()}
+        self.collection.replace_one({"_id": self.owner}, circuit, upsert=True)
+        return circuit
+
+    def clear(self):
+        self.collection.delete_one({"_id": self.owner})
+
+    def append(self, line):
+        """Append a gate line; returns the updated circuit."""
+        circuit = self.collection.find_one_and_update({"_id": self.owner},
+                                                      {"$inc": {"next_pos": 1}},
+                                                      {"next_pos": 1})
+        if circuit is None:
+            return None
+        gate = _gate(circuit["next_pos"], line)
+        return self.collection.find_one_and_update(
+            {"_id": self.owner},
+            {"$push": {"gates": gate,
+                       "undo": {"$each": [{"op": "append", "id": gate["id"]}], "$slice": -UNDO_DEPTH}},
+             "$set": {"updated": datetime.datetime.today()}},
+            return_document=ReturnDocument.AFTER)
+
+    def gate_at(self, index):
+        """The gate at ``index`` (0 is the first line after the header) or None."""
+        if index < 0:
+            return None
+        circuit = self.collection.find_one({"_id": self.owner}, {"gates": {"$slice": [index, 1]}})
+        if not circuit or not circuit["gates"]:
+            return None
+        return circuit["gates"][0]
+
+    def delete(self, gate_id):
+        """Remove a gate; returns the updated circuit or None if there is no such gate."""
+        before = self.collection.find_one_and_update(
+            {"_id": self.owner, "gates.id": gate_id},
+            {"$pull": {"gates": {"id": gate_id}},
+             "$set": {"updated": datetime.datetime.today()}},
+            {"gates": {"$elemMatch": {"id": gate_id}}})
+        if before is None:
+            return None
+        return self.collection.find_one_and_update(
+            {"_id": self.owner},
+            {"$push": {"undo": {"$each": [{"op": "delete", "gate": before["gates"][0]}],
+                                "$slice": -UNDO_DEPTH}}},
+            return_document=ReturnDocument.AFTER)
+
+    def undo(self):
+        """Revert the last append or delete; returns the updated circuit or None if there is nothing to undo."""
+        before = self.collection.find_one_and_update({"_id": self.owner, "undo.0": {"$exists": True}},
+                                                     {"$pop": {"undo": 1}},
+                                                     {"undo": {"$slice": -1}})
+        if before is None:
+            return None
+        entry = before["undo"][0]
+        if entry["op"] == "append":
+            update = {"$pull": {"gates": {"id": entry["id"]}}}
+        else:
+            update = {"$push": {"gates": {"$each": [entry["gate"]], "$sort": {"pos": 1}}}}
+        update["$set"] = {"updated": datetime.datetime.today()}
+        return self.collection.find_one_and_update({"_id": self.owner}, update,
+                                                   return_document=ReturnDocument.AFTER)
+
+    @staticmethod
+    def lines(circuit):
+        return circuit["header"] + [gate["line"] for gate in circuit["gates"]]
+
+    @staticmethod
+    def qasm(circuit):
+        return "\n".join(CircuitEditor.lines(circuit)) + "\n"
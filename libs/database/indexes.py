@@ -0,0 +1,76 @@
+"""Indexes for every query pattern of the web application and the worker.
+
+``ensure_indexes`` is idempotent and runs at start-up (``DB_ENSURE_INDEXES``)
+and through ``flask indexes``.
+"""
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+# collection -> [(index name, keys, options)]
+INDEXES = {
+    "user": [
+        ("email_unique", [("email", ASCENDING)], {"unique": True}),
+    ],
+    "open_jobs": [
+        ("user_id_date", [("user_id", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)], {}),
+        ("processor_date", [("processor.name", ASCENDING), ("date", ASCENDING)], {}),
+        ("processor_user_date", [("processor.name", ASCENDING), ("user_id", ASCENDING), ("date", ASCENDING)], {}),
+        ("date", [("date", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "running_jobs": [
+        ("claimed", [("claimed", ASCENDING)], {}),
+    ],
+    "job_status": [
+        # older jobs fall back to the job collections in status.get
+        ("updated_ttl", [("updated", ASCENDING)], {"expireAfterSeconds": 30*24*3600}),
+    ],
+    "sessions": [
+        ("expires_ttl", [("expires", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "session_fields": [
+        ("sid", [("sid", ASCENDING)], {}),
+        ("expires_ttl", [("expires", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "outbox": [
+        ("status_next_attempt", [("status", ASCENDING), ("next_attempt", ASCENDING)], {}),
+    ],
+    "processed_jobs": [
+        ("user_id_date_finish", [("user_id", ASCENDING), ("date_finish", ASCENDING), ("_id", ASCENDING)], {}),
+        ("open_id", [("open_id", ASCENDING)], {}),
+        ("date_finish", [("date_finish", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+}
+
+
+def ensure_indexes(db, logger=None):
+    """Create all declared indexes; returns the names of the indexes that could not be built."""
+    failed = []
+    for collection, indexes in INDEXES.items():
+        for name, keys, options in indexes:
+            try:
+                db[collection].create_index(keys, name=name, **options)
+            except OperationFailure as error:
+                failed.append("{}.{}".format(collection, name))
+                if logger:
+                    logger.error("Could not create index %s.%s: %s", collection, name, error)
+    return failed
+
+
+def missing_indexes(db):
+    missing = []
+    for collection, indexes in INDEXES.items():
+        existing = db[collection].index_information()
+        for name, _, _ in indexes:
+            if name not in existing:
+                missing.append("{}.{}".format(collection, name))
+    return missing
+
+
+def unused_indexes(db):
+    """Indexes without any recorded access since the mongod was started."""
+    unused = []
+    for collection in INDEXES:
+        for stats in db[collection].aggregate([{"$indexStats": {}}]):
+            if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                unused.append("{}.{}".format(collection, stats["name"]))
+    return unused
@@ -0,0 +1,131 @@
+"""Outbox for notification mails.
+
+``send_message`` only stores the mail in the ``outbox`` collection and wakes
+the background sender of this process, so requests never wait for the mail
+server. The sender claims due mails in batches, delivers each batch over one
+SMTP connection and retries failed mails with exponential backoff.
+"""
+import time
+import uuid
+import queue
+import datetime
+import threading
+
+from flask import current_app
+from flask_mail import Message
+from pymongo import ReturnDocument
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class Outbox:
+    def __init__(self, app, batch_size=20, max_attempts=5, backoff=30, poll_interval=10):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self._wakeup = queue.Queue()
+        self._sender = None
+        self._sender_lock = threading.Lock()
+
+    def enqueue(self, to, subject, html):
+        now = datetime.datetime.today()
+        mail_id = uuid.uuid4().hex
+        self.app.db.outbox.insert_one({"_id": mail_id,
+                                       "to": to,
+                                       "subject": subject,
+                                       "html": html,
+                                       "status": PENDING,
+                                       "attempts": 0,
+                                       "next_attempt": now,
+                                       "created": now})
+        self._wakeup.put(mail_id)
+        return mail_id
+
+    def claim(self):
+        """Mark the next due mail as sending; mails stuck in sending for 10 minutes are retried."""
+        now = datetime.datetime.today()
+        stuck = now - datetime.timedelta(minutes=10)
+        return self.app.db.outbox.find_one_and_update(
+            {"$or": [{"status": PENDING, "next_attempt": {"$lte": now}},
+                     {"status": SENDING, "locked": {"$lt": stuck}}]},
+            {"$set": {"status": SENDING, "locked": now}},
+            sort=[("next_attempt", 1)],
+            return_document=ReturnDocument.AFTER)
+
+    def _failed(self, mail, error):
+        attempts = mail["attempts"] + 1
+        delay = datetime.timedelta(seconds=self.backoff * 2**(attempts - 1))
+        status = FAILED if attempts >= self.max_attempts else PENDING
+        self.app.db.outbox.update_one({"_id": mail["_id"]},
+                                      {"$set": {"status": status,
+                                                "attempts": attempts,
+                                                "error": str(error),
+                                                "next_attempt": datetime.datetime.today() + delay}})
+
+    def send_batch(self):
+        """Deliver up to ``batch_size`` due mails over one SMTP connection; returns the number sent."""
+        batch = []
+        while len(batch) < self.batch_size:
+            mail = self.claim()
+            if mail is None:
+                break
+            batch.append(mail)
+        if not batch:
+            return 0
+
+        sent = 0
+        mailer = self.app.extensions["mail"]
+        try:
+            with mailer.connect() as connection:
+                for mail in batch:
+                    message = Message(mail["subject"],
+                                      recipients=[mail["to"]],
+                                      html=mail["html"],
+                                      sender=self.app.config["MAIL_DEFAULT_SENDER"])
+                    try:
+                        connection.send(message)
+                    except Exception as error:
+                        self._failed(mail, error)
+                        continue
+                    self.app.db.outbox.update_one({"_id": mail["_id"]},
+                                                  {"$set": {"status": SENT,
+                                                            "sent": datetime.datetime.today()}})
+                    sent += 1
+        except Exception as error:
+            # could not connect, every claimed mail still marked as sending is retried
+            self.app.logger.error("Could not connect to mail server: %s", error)
+            for mail in batch:
+                if self.app.db.outbox.count_documents({"_id": mail["_id"], "status": SENDING}):
+                    self._failed(mail, error)
+        return sent
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self._wakeup.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    pass
+                try:
+                    while self.send_batch() == self.batch_size:
+                        pass
+                except Exception:
+                    self.app.logger.exception("Outbox sender failed")
+                    time.sleep(self.poll_interval)
+
+    def start_sender(self):
+        with self._sender_lock:
+            if self._sender is not None:
+                return
+            self._sender = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+            self._sender.start()
+
+
+def send_message(to, subject, html):
+    """Queue a mail for delivery by the background sender."""
+    return current_app.outbox.enqueue(to, subject, html)
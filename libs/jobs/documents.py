@@ -0,0 +1,34 @@
+"""Conversion between job dataclasses and their mongodb documents.
+
+Job documents carry derived fields next to the dataclass fields, e.g. the
+verbose transpilation computed once at submit time, so documents are filtered
+to the dataclass fields when loaded.
+"""
+from dataclasses import asdict, fields
+
+from interface.libs.cache.transpiler import verbose_instructions
+
+
+def load(cls, document):
+    """Build the dataclass ``cls`` from a document, ignoring derived fields."""
+    names = {field.name for field in fields(cls)}
+    return cls(**{key: value for key, value in document.items() if key in names})
+
+
+def experiment_document(job):
+    document = asdict(job)
+    document["instructions_verbose"] = verbose_instructions(job.instructions)
+    return document
+
+
+def result_document(result, job_data):
+    document = asdict(result)
+    document["instructions_verbose"] = stored_verbose(job_data)
+    return document
+
+
+def stored_verbose(document):
+    """Verbose transpilation of a job document, computed only for documents not yet backfilled."""
+    if document.get("instructions_verbose") is not None:
+        return document["instructions_verbose"]
+    return verbose_instructions(document["instructions"])
@@ -0,0 +1,202 @@
+"""Estimated waiting times of the processor queues.
+
+Every job gets a ``cost`` in seconds when it is submitted: the number of
+circuit layers it executes (from its depth and gate count) divided by the
+CLOPS of its processor. The ``queue_load`` collection keeps two running sums
+per processor, the seconds ever ``enqueued`` and the seconds ``drained`` by
+starting or removing jobs. A job stores the ``enqueued`` sum in front of it as
+its ``queue_position``, so its wait is ``queue_position - drained + cost``.
+Both sums are updated with ``$inc`` and the queue is never scanned for an ETA.
+"""
+import re
+import math
+from dataclasses import dataclass
+
+from pymongo import ReturnDocument, UpdateOne
+
+from interface.libs.simulation.execution import SHOTS
+
+_qreg = re.compile(r"^qreg\s+(\w+)\s*\[\s*(\d+)\s*\]")
+_operand = re.compile(r"(\w+)\s*(?:\[\s*(\d+)\s*\])?")
+_skipped = ("OPENQASM", "include", "qreg", "creg", "gate", "opaque", "barrier", "//", "{", "}")
+
+
+@dataclass
+class CircuitStats:
+    depth: int = 0
+    gates: int = 0
+    two_qubit_gates: int = 0
+    measurements: int = 0
+
+
+def circuit_stats(instructions):
+    """Depth and gate counts of an OpenQASM 2 instruction list, without building the circuit."""
+    registers = {}
+    layers = {}
+    stats = CircuitStats()
+    in_definition = False
+    for line in instructions:
+        line = line.strip()
+        match = _qreg.match(line)
+        if match:
+            registers[match.group(1)] = int(match.group(2))
+            continue
+        if line.startswith(("gate", "opaque")):
+            in_definition = "{" in line and "}" not in line
+            continue
+        if in_definition:
+            in_definition = "}" not in line
+            continue
+        if not line or line.startswith(_skipped):
+            continue
+        if line.startswith("if"):
+            line = line[line.find(")") + 1:].strip()
+        statement = line.rstrip(";").split("->")[0]
+        parts = statement.split(None, 1)
+        if len(parts) < 2:
+            continue
+        name = parts[0].split("(")[0]
+        operands = parts[1]
+        if "(" in parts[0] and ")" not in parts[0]:
+            # parameters with spaces, e.g. `rz(pi / 2) q[0]`
+            operands = statement[statement.find(")") + 1:]
+        operands = [(register, index) for register, index in _operand.findall(operands)
+                    if register in registers]
+        if not operands:
+            continue
+        if len(operands) == 1 and not operands[0][1]:
+            # `h q;` applies the gate to every qubit of the register
+            register = operands[0][0]
+            applications = [[(register, i)] for i in range(registers[register])]
+        else:
+            applications = [[(register, int(index or 0)) for register, index in operands]]
+        for qubits in applications:
+            layer = max(layers.get(q, 0) for q in qubits) + 1
+            for q in qubits:
+                layers[q] = layer
+            if name == "measure":
+                stats.measurements += 1
+            else:
+                stats.gates += 1
+                if len(qubits) > 1:
+                    stats.two_qubit_gates += 1
+    stats.depth = max(layers.values(), default=0)
+    return stats
+
+
+def job_cost(instructions, processor, shots=SHOTS):
+    """Seconds ``processor`` needs for ``shots`` runs of the circuit.
+
+    CLOPS counts layers of log2(Quantum Volume) qubits per second, so a
+    circuit runs at least ``depth`` layers and at least as many layers as its
+    gates fill at that width.
+    """
+    stats = circuit_stats(instructions)
+    width = max(math.log2(processor.get("Quantum Volume", 2)), 1)
+    layers = max(stats.depth, math.ceil(stats.gates/width), 1)
+    return shots*layers/processor["CLOPS"]
+
+
+def enqueue_many(db, documents):
+    """Insert job documents into ``open_jobs`` and add their cost to the queues of their processors.
+
+    One ``$inc`` per processor and one ``insert_many`` for the whole batch.
+    """
+    queues = {}
+    for document in documents:
+        document["cost"] = job_cost(document["instructions"], document["processor"])
+        queues.setdefault(document["processor"]["name"], []).append(document)
+    for processor_name, queue in queues.items():
+        total = sum(document["cost"] for document in queue)
+        load = db.queue_load.find_one_and_update({"_id": processor_name},
+                                                 {"$inc": {"enqueued": total, "drained": 0}},
+                                                 upsert=True,
+                                                 return_document=ReturnDocument.AFTER)
+        position = load["enqueued"] - total
+        for document in queue:
+            document["queue_position"] = position
+            position += document["cost"]
+    if documents:
+        db.open_jobs.insert_many(documents, ordered=False)
+    return documents
+
+
+def remove(db, job_data):
+    """Delete an open job and take its cost off its queue; False if it was already gone.
+
+    The cost is only drained when this call removed the job, so concurrent
+    workers and admins never drain the same job twice.
+    """
+    if db.open_jobs.delete_one({"_id": job_data["_id"]}).deleted_count == 0:
+        return False
+    dequeued(db, [job_data])
+    return True
+
+
+def dequeued(db, jobs):
+    """Take the cost of jobs that left ``open_jobs`` off their queues.
+
+    Only pass jobs this caller removed itself, see ``remove``.
+    """
+    drained = {}
+    for job_data in jobs:
+        name = job_data["processor"]["name"]
+        drained[name] = drained.get(name, 0) + job_data.get("cost", 0)
+    updates = [UpdateOne({"_id": name}, {"$inc": {"drained": seconds}}, upsert=True)
+               for name, seconds in drained.items() if seconds]
+    if updates:
+        db.queue_load.bulk_write(updates, ordered=False)
+
+
+def requeued(db, job_data):
+    """Put the cost of a job that went back to ``open_jobs`` on its queue again."""
+    if job_data.get("cost"):
+        db.queue_load.update_one({"_id": job_data["processor"]["name"]},
+                                 {"$inc": {"drained": -job_data["cost"]}},
+                                 upsert=True)
+
+
+def pending_seconds(db):
+    """Mapping of processor name to the seconds of work waiting in its queue."""
+    return {load["_id"]: max(load.get("enqueued", 0) - load.get("drained", 0), 0)
+            for load in db.queue_load.find()}
+
+
+def wait_seconds(db, job_data, running=False):
+    """Seconds until the job is finished; jobs from before the estimator only count themselves."""
+    cost = job_data.get("cost")
+    if cost is None:
+        cost = job_cost(job_data["instructions"], job_data["processor"])
+    if running or "queue_position" not in job_data:
+        return cost
+    load = db.queue_load.find_one({"_id": job_data["processor"]["name"]}) or {}
+    return max(job_data["queue_position"] - load.get("drained", 0), 0) + cost
+
+
+def rebuild(db):
+    """Recompute costs, positions and sums from the open jobs, e.g. after a manual cleanup."""
+    totals = {}
+    updates = []
+    for job_data in db.open_jobs.find({}, {"instructions": 1, "processor": 1}).sort("date", 1):
+        name = job_data["processor"]["name"]
+        cost = job_cost(job_data["instructions"], job_data["processor"])
+        updates.append(UpdateOne({"_id": job_data["_id"]},
+                                 {"$set": {"cost": cost, "queue_position": totals.get(name, 0)}}))
+        totals[name] = totals.get(name, 0) + cost
+    if updates:
+        db.open_jobs.bulk_write(updates, ordered=False)
+    db.queue_load.delete_many({})
+    if totals:
+        db.queue_load.insert_many([{"_id": name, "enqueued": seconds, "drained": 0}
+                                   for name, seconds in totals.items()])
+    return totals
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return "{} s".format(int(math.ceil(seconds)))
+    minutes, seconds = divmod(int(math.ceil(seconds)), 60)
+    if minutes < 60:
+        return "{} min {} s".format(minutes, seconds)
+    hours, minutes = divmod(minutes, 60)
+    return "{} h {} min".format(hours, minutes)
@@ -0,0 +1,78 @@
+"""Paginated job listings for the job inspector.
+
+Listings only fetch the columns shown in the inspector and are paged with
+keyset cursors on (date, _id), newest first, so a page costs one indexed
+range query no matter how many jobs exist.
+"""
+import base64
+import binascii
+import datetime
+from dataclasses import dataclass
+
+from interface.libs.jobs.documents import load
+
+
+@dataclass
+class OpenJobListing:
+    _id: str
+    user_id: str
+    processor: dict
+    category: str
+    date: datetime.datetime
+
+
+@dataclass
+class ProcessedJobListing:
+    _id: str
+    user_id: str
+    open_id: str
+    processor: dict
+    category: str
+    date_submit: datetime.datetime
+    date_finish: datetime.datetime
+
+
+OPEN_JOB_PROJECTION = {"user_id": 1, "processor.name": 1, "category": 1, "date": 1}
+PROCESSED_JOB_PROJECTION = {"user_id": 1, "open_id": 1, "processor.name": 1, "category": 1,
+                            "date_submit": 1, "date_finish": 1}
+
+
+def encode_cursor(date, _id):
+    token = "{}|{}".format(date.isoformat(), _id)
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ValueError for malformed cursors."""
+    try:
+        token = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date, _id = token.split("|", 1)
+        return datetime.datetime.fromisoformat(date), _id
+    except (UnicodeDecodeError, binascii.Error) as error:
+        raise ValueError("invalid cursor") from error
+
+
+def page(collection, cls, projection, date_field, query=None, after=None, size=25):
+    """One page of ``cls`` listings newer-first, and the cursor of the next page (or None)."""
+    query = dict(query or {})
+    if after:
+        date, _id = decode_cursor(after)
+        query["$or"] = [{date_field: {"$lt": date}},
+                        {date_field: date, "_id": {"$lt": _id}}]
+    documents = list(collection.find(query, projection)
+                               .sort([(date_field, -1), ("_id", -1)])
+                               .limit(size + 1))
+    next_cursor = None
+    if len(documents) > size:
+        last = documents[size - 1]
+        next_cursor = encode_cursor(last[date_field], last["_id"])
+    return [load(cls, document) for document in documents[:size]], next_cursor
+
+
+def open_jobs_page(db, query=None, after=None, size=25):
+    return page(db.open_jobs, OpenJobListing, OPEN_JOB_PROJECTION, "date", query, after, size)
+
+
+def processed_jobs_page(db, query=None, after=None, size=25):
+    return page(db.processed_jobs, ProcessedJobListing, PROCESSED_JOB_PROJECTION, "date_finish",
+                query, after, size)
@@ -0,0 +1,20 @@
+from pymongo import UpdateOne
+
+from interface.libs.cache.transpiler import verbose_instructions
+
+
+def backfill_instructions_verbose(collection, batch_size=500):
+    """Store ``instructions_verbose`` on every document of ``collection`` that lacks it."""
+    missing = collection.find({"instructions_verbose": {"$exists": False}},
+                              {"instructions": 1})
+    updated = 0
+    batch = []
+    for document in missing:
+        batch.append(UpdateOne({"_id": document["_id"]},
+                               {"$set": {"instructions_verbose": verbose_instructions(document["instructions"])}}))
+        if len(batch) == batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
@@ -0,0 +1,23 @@
+"""Queue depth per processor.
+
+All depths are fetched with a single ``$group`` aggregation over ``open_jobs``
+and kept for ``ttl`` seconds, so page views do not scan the queue.
+"""
+from interface.libs.cache.lru import LRUCache
+
+
+class QueueDepth:
+    def __init__(self, ttl=5):
+        self._cache = LRUCache(maxsize=1, ttl=ttl)
+
+    def table(self, db):
+        """Mapping of processor name to the number of open jobs."""
+        depths = self._cache.get("depths")
+        if depths is None:
+            pipeline = [{"$group": {"_id": "$processor.name", "count": {"$sum": 1}}}]
+            depths = {row["_id"]: row["count"] for row in db.open_jobs.aggregate(pipeline)}
+            self._cache.set("depths", depths)
+        return dict(depths)
+
+    def depth(self, db, processor_name):
+        return self.table(db).get(processor_name, 0)
@@ -0,0 +1,136 @@
+"""Fair-share scheduling of the open jobs.
+
+Every processor has its own queue, the open jobs with its name. Only the
+oldest job of every user in a queue competes for dispatch and the job with the
+highest score wins:
+
+    score = waited seconds * aging + priority - recent usage / share * usage_weight
+
+``recent usage`` is the processor time (the ``cost`` of ``eta``) a user was
+dispatched, decaying with ``half_life``, so heavy users fall behind light users
+and admin jobs (``admin_priority``, ``admin_share``) go first, while waiting
+raises every score until nothing starves. ``admit_many`` stops a user from
+having more than ``user_quota`` open jobs per processor.
+
+Workers pull jobs with ``dispatch``/``dispatch_many``; a job is claimed with
+``worker.claim_job``, so several workers can dispatch at once. Only plain
+queries, ``$group`` aggregations and updates are used, so the scheduler runs
+against mongomock as well (see ``tests/test_scheduler.py``).
+"""
+import datetime
+
+from interface.libs.jobs.worker import claim_job
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class Scheduler:
+    def __init__(self, user_quota=20, admin_priority=600, admin_share=4,
+                 aging=1.0, usage_weight=60, half_life=3600):
+        self.user_quota = user_quota
+        self.admin_priority = admin_priority
+        self.admin_share = admin_share
+        self.aging = aging
+        self.usage_weight = usage_weight
+        self.half_life = half_life
+
+    def admit_many(self, db, documents, is_admin=False):
+        """Check the quota of the job owners and set the priority and share of the jobs.
+
+        The whole batch has to fit into the quota; raises QuotaExceeded.
+        """
+        if not is_admin and self.user_quota:
+            submitted = {}
+            for document in documents:
+                key = (document["user_id"], document["processor"]["name"])
+                submitted[key] = submitted.get(key, 0) + 1
+            for (user_id, processor_name), count in submitted.items():
+                waiting = db.open_jobs.count_documents({"processor.name": processor_name,
+                                                        "user_id": user_id},
+                                                       limit=self.user_quota)
+                if waiting + count > self.user_quota:
+                    raise QuotaExceeded("You already have {} jobs waiting for {}, at most {} are allowed".format(
+                        waiting, processor_name, self.user_quota))
+        for document in documents:
+            document["priority"] = self.admin_priority if is_admin else 0
+            document["share"] = self.admin_share if is_admin else 1
+        return documents
+
+    def remaining_quota(self, db, user_id, processor_name, is_admin=False):
+        """How many more jobs ``user_id`` may queue for ``processor_name``; None if unlimited."""
+        if is_admin or not self.user_quota:
+            return None
+        waiting = db.open_jobs.count_documents({"processor.name": processor_name, "user_id": user_id},
+                                               limit=self.user_quota)
+        return self.user_quota - waiting
+
+    def _decayed(self, usage, now):
+        elapsed = (now - usage["updated"]).total_seconds()
+        return usage["usage"]*0.5**(max(elapsed, 0)/self.half_life)
+
+    def usage(self, db, user_ids, now=None):
+        """Recent processor time of ``user_ids`` in seconds."""
+        now = now or datetime.datetime.today()
+        return {usage["_id"]: self._decayed(usage, now)
+                for usage in db.scheduler_usage.find({"_id": {"$in": list(user_ids)}})}
+
+    def charge(self, db, job_data, now=None):
+        """Add the cost of a dispatched job to the decayed usage of its owner, in one atomic update."""
+        now = now or datetime.datetime.today()
+        # date differences are in milliseconds
+        elapsed = {"$max": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, 0]}
+        decay = {"$pow": [0.5, {"$divide": [elapsed, 1000*self.half_life]}]}
+        db.scheduler_usage.update_one({"_id": job_data["user_id"]},
+                                      [{"$set": {"usage": {"$add": [{"$multiply": [{"$ifNull": ["$usage", 0]},
+                                                                                   decay]},
+                                                                    job_data.get("cost", 0)]},
+                                                 "updated": now}}],
+                                      upsert=True)
+
+    def candidates(self, db, processor_name, now=None):
+        """Oldest job of every user waiting for ``processor_name``, best score first."""
+        now = now or datetime.datetime.today()
+        pipeline = [{"$match": {"processor.name": processor_name}},
+                    {"$sort": {"date": 1}},
+                    {"$group": {"_id": "$user_id",
+                                "job_id": {"$first": "$_id"},
+                                "date": {"$first": "$date"},
+                                "priority": {"$first": "$priority"},
+                                "share": {"$first": "$share"}}}]
+        heads = list(db.open_jobs.aggregate(pipeline))
+        usage = self.usage(db, [head["_id"] for head in heads], now)
+        for head in heads:
+            waited = (now - head["date"]).total_seconds()
+            head["score"] = (waited*self.aging
+                             + (head.get("priority") or 0)
+                             - usage.get(head["_id"], 0)/(head.get("share") or 1)*self.usage_weight)
+        return sorted(heads, key=lambda head: (-head["score"], head["date"]))
+
+    def dispatch(self, db, processor_name, worker_id):
+        """Claim the next job for ``processor_name``; None if its queue is empty."""
+        now = datetime.datetime.today()
+        for head in self.candidates(db, processor_name, now):
+            job_data = db.open_jobs.find_one({"_id": head["job_id"]})
+            if job_data and claim_job(db, job_data, worker_id):
+                self.charge(db, job_data, now)
+                return job_data
+        return None
+
+    def dispatch_many(self, db, limit, worker_id, processor_names=None):
+        """Claim up to ``limit`` jobs, taking turns between the processor queues."""
+        if processor_names is None:
+            processor_names = db.open_jobs.distinct("processor.name")
+        queues = list(processor_names)
+        jobs = []
+        while queues and len(jobs) < limit:
+            for processor_name in list(queues):
+                job_data = self.dispatch(db, processor_name, worker_id)
+                if job_data is None:
+                    queues.remove(processor_name)
+                    continue
+                jobs.append(job_data)
+                if len(jobs) == limit:
+                    break
+        return jobs
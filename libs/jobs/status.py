@@ -0,0 +1,145 @@
+"""Status of submitted jobs for the live status stream.
+
+The ``job_status`` collection holds one small document per job, keyed by the
+id of the open job. It is written on every transition (``queued`` at submit
+time, ``running`` when a worker claims the job, ``processed`` or ``failed``
+when it is done), so status requests read one document instead of rendering
+the job page. Jobs submitted before the collection existed are looked up in
+the job collections; their first status document is written by a later
+transition, which therefore also sets the owner (``$setOnInsert``).
+"""
+import time
+import json
+import datetime
+
+from pymongo import UpdateOne
+
+from interface.libs.jobs import eta
+
+QUEUED = "queued"
+RUNNING = "running"
+PROCESSED = "processed"
+FAILED = "failed"
+FINAL = (PROCESSED, FAILED)
+
+
+def _values(status, fields, user_id=None):
+    values = {"$set": dict(fields, status=status, updated=datetime.datetime.today())}
+    if user_id is not None:
+        values["$setOnInsert"] = {"user_id": user_id}
+    return values
+
+
+def _update(job_id, status, fields, user_id=None):
+    return UpdateOne({"_id": job_id}, _values(status, fields, user_id), upsert=True)
+
+
+def _set(db, job_id, status, fields, user_id=None):
+    db.job_status.update_one({"_id": job_id}, _values(status, fields, user_id), upsert=True)
+
+
+def _queued(document):
+    return _update(document["_id"], QUEUED, {"user_id": document["user_id"],
+                                             "processor": {"name": document["processor"]["name"]},
+                                             "date": document["date"],
+                                             "cost": document.get("cost"),
+                                             "queue_position": document.get("queue_position")})
+
+
+def queued(db, document):
+    queued_many(db, [document])
+
+
+def queued_many(db, documents):
+    updates = [_queued(document) for document in documents]
+    if updates:
+        db.job_status.bulk_write(updates, ordered=False)
+
+
+def running(db, job_data):
+    _set(db, job_data["_id"], RUNNING, {}, job_data["user_id"])
+
+
+def running_many(db, jobs):
+    updates = [_update(job_data["_id"], RUNNING, {}, job_data["user_id"]) for job_data in jobs]
+    if updates:
+        db.job_status.bulk_write(updates, ordered=False)
+
+
+def processed(db, results):
+    """Mark the open jobs of ``results`` as processed, with one write."""
+    updates = [_update(result.open_id, PROCESSED, {"result_id": result._id}, result.user_id)
+               for result in results]
+    if updates:
+        db.job_status.bulk_write(updates, ordered=False)
+
+
+def failed(db, jobs, error):
+    updates = [_update(job_data["_id"], FAILED, {"error": str(error)}, job_data["user_id"])
+               for job_data in jobs]
+    if updates:
+        db.job_status.bulk_write(updates, ordered=False)
+
+
+def _legacy(db, job_id):
+    job_data = db.open_jobs.find_one({"_id": job_id})
+    if job_data:
+        return dict(job_data, status=QUEUED)
+    running_job = db.running_jobs.find_one({"_id": job_id})
+    if running_job:
+        return dict(running_job["job"], status=RUNNING)
+    result = db.processed_jobs.find_one({"open_id": job_id}, {"user_id": 1})
+    if result:
+        return {"_id": job_id, "user_id": result["user_id"], "status": PROCESSED, "result_id": result["_id"]}
+    return None
+
+
+def get(db, job_id):
+    """Status document of a job or None; queued jobs get their position and estimated wait."""
+    current = db.job_status.find_one({"_id": job_id}) or _legacy(db, job_id)
+    if current is None:
+        return None
+    current = dict(current)
+    if "user_id" not in current:
+        # written for a legacy job before the owner was set on insert
+        legacy = _legacy(db, job_id)
+        current["user_id"] = legacy["user_id"] if legacy else None
+    if current["status"] == QUEUED and current.get("processor"):
+        current["position"] = db.open_jobs.count_documents({"processor.name": current["processor"]["name"],
+                                                            "date": {"$lt": current["date"]}})
+        if current.get("cost") is not None or current.get("instructions"):
+            current["estimated_wait"] = eta.format_duration(eta.wait_seconds(db, current))
+    return current
+
+
+def wait(db, job_id, known=None, timeout=25, interval=1):
+    """Long poll: the status of a job as soon as it differs from ``known`` or ``timeout`` expired."""
+    deadline = time.monotonic() + timeout
+    while True:
+        current = get(db, job_id)
+        if current is None or current["status"] != known or time.monotonic() >= deadline:
+            return current
+        time.sleep(interval)
+
+
+def public(current):
+    """Fields of a status document shown to its owner."""
+    return {key: current[key] for key in ("status", "position", "estimated_wait", "result_id", "error")
+            if current.get(key) is not None}
+
+
+def events(db, job_id, present=public, timeout=60, interval=1):
+    """Server-sent events with ``present(status)`` of a job, one per change, until it is done."""
+    deadline = time.monotonic() + timeout
+    last = None
+    while time.monotonic() < deadline:
+        current = get(db, job_id)
+        if current is None:
+            return
+        data = present(current)
+        if data != last:
+            yield "event: status\ndata: {}\n\n".format(json.dumps(data))
+            last = data
+        if current["status"] in FINAL:
+            return
+        time.sleep(interval)
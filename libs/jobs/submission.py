@@ -0,0 +1,165 @@
+"""Validation and bulk submission of QASM circuits.
+
+Used by the JSON API and the multi-file upload of the job creator: every
+circuit is checked on its own, so one response can report the errors of some
+circuits and still submit the others with one ``insert_many``.
+"""
+import io
+import uuid
+import zipfile
+import datetime
+
+from interface.libs.cache.transpiler import pulse_instructions
+from interface.libs.simulation.execution import has_measurement
+from interface.libs.jobs import eta, status
+from interface.libs.jobs.documents import experiment_document
+from interface.model import Experiment
+
+
+class InvalidCircuit(ValueError):
+    pass
+
+
+def parse_qasm(data, max_bytes):
+    """Instruction lines of an uploaded QASM file (``bytes`` or ``str``); raises InvalidCircuit."""
+    if len(data) > max_bytes:
+        raise InvalidCircuit("larger than {} bytes".format(max_bytes))
+    if isinstance(data, bytes):
+        try:
+            data = data.decode("utf-8")
+        except UnicodeDecodeError:
+            raise InvalidCircuit("not a UTF-8 text file")
+    instructions = data.splitlines()
+    statements = [line.strip() for line in instructions
+                  if line.strip() and not line.strip().startswith("//")]
+    if not statements:
+        raise InvalidCircuit("empty file")
+    if not statements[0].startswith("OPENQASM"):
+        raise InvalidCircuit("does not start with an OPENQASM header")
+    if not has_measurement(instructions):
+        raise InvalidCircuit("a job needs to have at least one measure instruction")
+    return instructions
+
+
+def _is_qasm(name):
+    return name.lower().endswith(".qasm")
+
+
+def read_uploads(files, max_file_bytes, max_total_bytes, max_files):
+    """(name, content) of the QASM files among the uploaded ``files``, and (name, error) for the rest.
+
+    ``files`` are werkzeug ``FileStorage`` objects of ``.qasm`` files or zip
+    archives of them. Everything is read from the upload stream into memory;
+    no file is read past ``max_file_bytes`` + 1 bytes (``parse_qasm`` rejects
+    those) and reading stops after ``max_total_bytes`` or ``max_files`` files.
+    """
+    circuits = []
+    errors = []
+    total = 0
+    for upload in files:
+        if upload.filename.lower().endswith(".zip"):
+            data = upload.stream.read(max_total_bytes + 1)
+            if len(data) > max_total_bytes:
+                errors.append((upload.filename, "larger than {} bytes".format(max_total_bytes)))
+                continue
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile:
+                errors.append((upload.filename, "not a zip archive"))
+                continue
+            entries = [info for info in archive.infolist()
+                       if not info.is_dir() and not info.filename.startswith("__MACOSX/")]
+        elif _is_qasm(upload.filename):
+            archive = None
+            entries = [upload]
+        else:
+            errors.append((upload.filename, "not a .qasm or .zip file"))
+            continue
+
+        for entry in entries:
+            name = upload.filename if archive is None else "{}/{}".format(upload.filename, entry.filename)
+            if archive is not None and not _is_qasm(entry.filename):
+                errors.append((name, "not a .qasm file"))
+                continue
+            if len(circuits) == max_files:
+                errors.append((name, "more than {} files".format(max_files)))
+                continue
+            if archive is None:
+                content = upload.stream.read(max_file_bytes + 1)
+            else:
+                if entry.file_size > max_file_bytes:
+                    errors.append((name, "larger than {} bytes".format(max_file_bytes)))
+                    continue
+                try:
+                    with archive.open(entry) as stream:
+                        content = stream.read(max_file_bytes + 1)
+                except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as error:
+                    # corrupt, encrypted or unsupported compression
+                    errors.append((name, str(error)))
+                    continue
+            if total + len(content) > max_total_bytes:
+                errors.append((name, "upload larger than {} bytes".format(max_total_bytes)))
+                continue
+            total += len(content)
+            circuits.append((name, content))
+    return circuits, errors
+
+
+def build_jobs(user_id, processor, circuits, max_bytes, category="manual"):
+    """(name, ``Experiment``) for the valid ``circuits``, a list of (name, QASM), and (name, error) for the others."""
+    jobs = []
+    errors = []
+    now = datetime.datetime.today()
+    for index, (name, data) in enumerate(circuits):
+        try:
+            instructions = parse_qasm(data, max_bytes)
+            instructions_pulse = pulse_instructions(instructions)
+        except InvalidCircuit as error:
+            errors.append((name, str(error)))
+            continue
+        except Exception as error:
+            # the transpiler rejects circuits that are not valid OpenQASM 2
+            errors.append((name, "invalid OpenQASM: {}".format(error)))
+            continue
+        jobs.append((name, Experiment(_id=uuid.uuid4().hex,
+                                      user_id=user_id,
+                                      processor=dict(processor),
+                                      category=category,
+                                      params={'none' : None},
+                                      instructions=instructions,
+                                      instructions_pulse=instructions_pulse,
+                                      # keep the submission order in the date ordered queues
+                                      date=now + datetime.timedelta(microseconds=index))))
+    return jobs, errors
+
+
+def submit_jobs(db, scheduler, jobs, is_admin=False):
+    """Admit ``jobs`` to the queues of their processors, all or none; raises QuotaExceeded."""
+    documents = scheduler.admit_many(db, [experiment_document(job) for job in jobs], is_admin)
+    documents = eta.enqueue_many(db, documents)
+    status.queued_many(db, documents)
+    return documents
+
+
+def submit_within_quota(db, scheduler, jobs, is_admin=False):
+    """Submit the (name, ``Experiment``) ``jobs`` that fit into the quota of their owner.
+
+    Returns the submitted (name, ``Experiment``) and (name, error) for the
+    jobs over the quota, in submission order.
+    """
+    remaining = {}
+    accepted = []
+    errors = []
+    for name, job in jobs:
+        key = (job.user_id, job.processor["name"])
+        if key not in remaining:
+            remaining[key] = scheduler.remaining_quota(db, job.user_id, job.processor["name"], is_admin)
+        if remaining[key] is None or remaining[key] > 0:
+            if remaining[key] is not None:
+                remaining[key] -= 1
+            accepted.append((name, job))
+        else:
+            errors.append((name, "not submitted, at most {} jobs may wait for {}".format(
+                scheduler.user_quota, job.processor["name"])))
+    submit_jobs(db, scheduler, [job for _, job in accepted], is_admin)
+    return accepted, errors
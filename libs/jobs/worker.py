@@ -0,0 +1,258 @@
+"""Standalone job-execution worker.
+
+The worker drains ``open_jobs`` outside of the web request path. A job is
+claimed by inserting it into ``running_jobs`` under its own ``_id`` (the unique
+index on ``_id`` makes the claim atomic across workers), simulated in a process
+pool and finally written to ``processed_jobs`` as a ``Result``.
+
+Jobs are picked by the fair-share ``app.scheduler``. Start it with
+``flask worker --processes 4``.
+"""
+import os
+import time
+import uuid
+import socket
+import datetime
+import multiprocessing
+
+from flask import render_template, url_for
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+
+from interface.libs.simulation.execution import (SHOTS,
+                                                 simulate,
+                                                 simulate_many,
+                                                 has_measurement,
+                                                 engine_for,
+                                                 NOISY)
+from interface.libs.simulation import noise, result_cache
+from interface.libs.email import outbox
+from interface.libs.jobs.documents import result_document
+from interface.libs.jobs import eta, status
+from interface.model import User, Result
+
+
+def claim_job(db, job_data, worker_id):
+    """Move one open job into ``running_jobs``; returns False if another worker was faster."""
+    try:
+        db.running_jobs.insert_one({"_id": job_data["_id"],
+                                    "job": job_data,
+                                    "worker": worker_id,
+                                    "claimed": datetime.datetime.today()})
+    except DuplicateKeyError:
+        return False
+    if not eta.remove(db, job_data):
+        # processed in the meantime (e.g. by an admin), drop our claim again
+        db.running_jobs.delete_one({"_id": job_data["_id"], "worker": worker_id})
+        return False
+    status.running(db, job_data)
+    return True
+
+
+def claim_jobs(db, jobs, worker_id):
+    """``claim_job`` for many open jobs with a constant number of writes; returns the claimed jobs.
+
+    Only the holder of a claim deletes an open job, so the open jobs found
+    after inserting the claims are exactly the ones this call removes.
+    """
+    if not jobs:
+        return []
+    now = datetime.datetime.today()
+    try:
+        db.running_jobs.insert_many([{"_id": job_data["_id"],
+                                      "job": job_data,
+                                      "worker": worker_id,
+                                      "claimed": now} for job_data in jobs], ordered=False)
+        taken = set()
+    except BulkWriteError as error:
+        if any(write_error["code"] != 11000 for write_error in error.details["writeErrors"]):
+            raise
+        taken = {jobs[write_error["index"]]["_id"] for write_error in error.details["writeErrors"]}
+    ids = [job_data["_id"] for job_data in jobs if job_data["_id"] not in taken]
+    still_open = set(db.open_jobs.distinct("_id", {"_id": {"$in": ids}}))
+    if len(still_open) < len(ids):
+        # processed in the meantime (e.g. by an admin), drop our claims again
+        db.running_jobs.delete_many({"_id": {"$in": [i for i in ids if i not in still_open]},
+                                     "worker": worker_id})
+    claimed = [job_data for job_data in jobs if job_data["_id"] in still_open]
+    if claimed:
+        db.open_jobs.delete_many({"_id": {"$in": list(still_open)}})
+        eta.dequeued(db, claimed)
+        status.running_many(db, claimed)
+    return claimed
+
+
+def release_job(db, job_data):
+    """Put a claimed job back into ``open_jobs``."""
+    db.open_jobs.replace_one({"_id": job_data["_id"]}, job_data, upsert=True)
+    db.running_jobs.delete_one({"_id": job_data["_id"]})
+    eta.requeued(db, job_data)
+    status.queued(db, job_data)
+
+
+def fail_job(db, job_data, error):
+    db.failed_jobs.insert_one({"_id": job_data["_id"],
+                               "job": job_data,
+                               "error": str(error),
+                               "date": datetime.datetime.today()})
+    db.running_jobs.delete_one({"_id": job_data["_id"]})
+    status.failed(db, [job_data], error)
+
+
+def requeue_stale_jobs(db, timeout):
+    """Release jobs whose worker died before finishing them."""
+    deadline = datetime.datetime.today() - datetime.timedelta(seconds=timeout)
+    stale = db.running_jobs.find({"claimed": {"$lt": deadline}})
+    for running in stale:
+        release_job(db, running["job"])
+
+
+def make_result(job_data, count):
+    return Result(_id=uuid.uuid4().hex,
+                  user_id=job_data["user_id"],
+                  open_id=job_data["_id"],
+                  processor=job_data["processor"],
+                  category=job_data['category'],
+                  params=job_data['params'],
+                  instructions=job_data["instructions"],
+                  result = count,
+                  date_submit = job_data["date"],
+                  date_finish = datetime.datetime.today())
+
+
+def finish_job(db, job_data, count):
+    """Store the counts of a simulated job as a ``Result`` and close the job."""
+    result = make_result(job_data, count)
+    db.processed_jobs.insert_one(result_document(result, job_data))
+    eta.remove(db, job_data)
+    db.running_jobs.delete_one({"_id": job_data["_id"]})
+    status.processed(db, [result])
+    return result
+
+
+def _simulate_group(processor_name, group):
+    """Counts of the jobs of one processor, or the error of each job that cannot be simulated.
+
+    The group is simulated with one call; if that fails, every job is
+    simulated on its own so that one bad circuit only fails itself.
+    """
+    engine = engine_for(processor_name)
+    try:
+        return simulate_many([job_data["instructions"] for job_data in group],
+                             engine=engine, processor=group[0]["processor"])
+    except Exception:
+        pass
+    counts = []
+    for job_data in group:
+        try:
+            counts.append(simulate(job_data["instructions"], SHOTS, engine, job_data["processor"]))
+        except Exception as error:
+            counts.append(error)
+    return counts
+
+
+def evaluate_open_jobs(db, jobs, worker_id="admin"):
+    """Evaluate many open jobs with one simulator call per processor.
+
+    All jobs are claimed first with ``claim_jobs``; jobs another worker claimed are skipped.
+    Jobs without a measurement and jobs that cannot be simulated are failed.
+    All results are written with one ``insert_many``.
+    Returns the stored results and the ids of the failed jobs.
+    """
+    groups = {}
+    dropped = []
+    for job_data in claim_jobs(db, jobs, worker_id):
+        if not has_measurement(job_data["instructions"]):
+            fail_job(db, job_data, "A job needs to have at least one measure instruction")
+            dropped.append(job_data["_id"])
+            continue
+        groups.setdefault(job_data["processor"]["name"], []).append(job_data)
+
+    results = []
+    documents = []
+    for processor_name, group in groups.items():
+        for job_data, count in zip(group, _simulate_group(processor_name, group)):
+            if isinstance(count, Exception):
+                fail_job(db, job_data, count)
+                dropped.append(job_data["_id"])
+                continue
+            result = make_result(job_data, count)
+            results.append(result)
+            documents.append(result_document(result, job_data))
+
+    if documents:
+        db.processed_jobs.insert_many(documents)
+        db.running_jobs.delete_many({"_id": {"$in": [result.open_id for result in results]}})
+    status.processed(db, results)
+    return results, dropped
+
+
+def notify_processed(app, result):
+    """Mail the owner of a processed job a link to its result page."""
+    user_data = app.db.user.find_one({"_id": result.user_id})
+    if not user_data:
+        return
+    user = User(**user_data)
+    if user.is_admin:
+        return
+    # outside of a request the link is built from SERVER_NAME and PREFERRED_URL_SCHEME
+    with app.app_context():
+        job_url = url_for("pages.processedjob", _jobID=result._id, _external=True)
+        html = render_template("notifications/notification_job_processed.html", job_url=job_url)
+        subject = "SaxonQ: Your job has been processed"
+        outbox.send_message(user.email, subject, html)
+
+
+def process_batch(app, pool, jobs):
+    db = app.db
+    pending = []
+    for job_data in jobs:
+        if not has_measurement(job_data["instructions"]):
+            fail_job(db, job_data, "A job needs to have at least one measure instruction")
+            continue
+        engine = engine_for(job_data["processor"]["name"])
+        arguments = (job_data["instructions"], SHOTS, engine, job_data["processor"])
+        pending.append((job_data, pool.apply_async(simulate, arguments)))
+
+    for job_data, outcome in pending:
+        try:
+            count = outcome.get(timeout=app.config["WORKER_JOB_TIMEOUT"])
+        except Exception as error:
+            app.logger.exception("Job %s failed", job_data["_id"])
+            fail_job(db, job_data, error)
+            continue
+        result = finish_job(db, job_data, count)
+        try:
+            notify_processed(app, result)
+        except Exception:
+            app.logger.exception("Could not notify user of job %s", job_data["_id"])
+
+
+def _init_pool_process(noisy, cache_size, cache_ttl):
+    result_cache.configure(maxsize=cache_size, ttl=cache_ttl)
+    noise.warm_up(noisy)
+
+
+def run(app, processes=None, processors=()):
+    """Poll ``open_jobs`` forever and simulate claimed jobs in a pool of ``processes``.
+
+    The noisy simulators of ``processors`` are built when the pool starts and
+    kept warm in every pool process. The pool processes are spawned, not
+    forked, because the app already holds a ``MongoClient`` and background
+    threads at this point.
+    """
+    processes = processes or app.config["WORKER_PROCESSES"]
+    worker_id = "{}:{}".format(socket.gethostname(), os.getpid())
+    noisy = [p for p in processors if engine_for(p["name"]) == NOISY]
+    context = multiprocessing.get_context("spawn")
+    initargs = (noisy, app.config["RESULT_CACHE_SIZE"], app.config["RESULT_CACHE_TTL"])
+    with app.app_context():
+        requeue_stale_jobs(app.db, app.config["WORKER_JOB_TIMEOUT"])
+        with context.Pool(processes, initializer=_init_pool_process, initargs=initargs) as pool:
+            app.logger.info("Worker %s started with %d processes", worker_id, processes)
+            while True:
+                jobs = app.scheduler.dispatch_many(app.db, processes, worker_id)
+                if not jobs:
+                    requeue_stale_jobs(app.db, app.config["WORKER_JOB_TIMEOUT"])
+                    time.sleep(app.config["WORKER_POLL_INTERVAL"])
+                    continue
+                process_batch(app, pool, jobs)
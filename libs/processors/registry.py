@@ -0,0 +1,114 @@
+"""Registry of the available quantum processors.
+
+Processors are looked up by name in O(1) and by size through a sorted index
+of qubit counts. The registry hands out read-only views; a reload builds a
+new snapshot and swaps it in, so readers never see a half loaded registry.
+The processors come from a JSON file (``PROCESSORS_FILE``), the
+``processors`` collection or, if both are empty, ``DEFAULT_PROCESSORS``.
+"""
+import json
+import time
+import bisect
+import random
+import threading
+from types import MappingProxyType
+
+DEFAULT_PROCESSORS = [{"name":"Trick",
+               "number of qubits": 8,
+               "Quantum Volume": 32,
+               "CLOPS": 3000,
+               "T1 (in sec)": 5,
+               "T2 (in sec)": 3,
+               "T2* (in sec)": 2.5,
+               "Fidelity 0": 0.99,
+               "Fidelity 1": 0.98,
+               "Fidelity X": 0.96,
+               "Fidelity CX": 0.92,
+
+               },
+              {"name":"Tick",
+               "number of qubits": 4,
+               "Quantum Volume": 20,
+               "CLOPS": 5000,
+               "T1 (in sec)": 12,
+               "T2 (in sec)": 10,
+               "T2* (in sec)": 7.5,
+               "Fidelity 0": 0.999,
+               "Fidelity 1": 0.989,
+               "Fidelity X": 0.969,
+               "Fidelity CX": 0.95
+               }, 
+               {"name":"Track",
+               "number of qubits": 3,
+               "Quantum Volume": 15,
+               "CLOPS": 1000,
+               "T1 (in sec)": 2,
+               "T2 (in sec)": 1.25,
+               "T2* (in sec)": 1.125,
+               "Fidelity 0": 0.90,
+               "Fidelity 1": 0.89,
+               "Fidelity X": 0.84,
+               "Fidelity CX": 0.72
+               }]
+
+
+class ProcessorRegistry:
+    def __init__(self, source, reload_interval=None):
+        """``source`` is a callable returning the list of processor dicts."""
+        self.source = source
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        processors = [MappingProxyType({key: value for key, value in p.items() if key != "_id"})
+                      for p in self.source()]
+        by_name = {p["name"]: p for p in processors}
+        by_size = sorted(processors, key=lambda p: p["number of qubits"])
+        sizes = [p["number of qubits"] for p in by_size]
+        with self._lock:
+            self._snapshot = (tuple(processors), by_name, tuple(by_size), sizes)
+            self._loaded = time.monotonic()
+
+    def _current(self):
+        if self.reload_interval and time.monotonic() - self._loaded > self.reload_interval:
+            self.reload()
+        return self._snapshot
+
+    def all(self):
+        return self._current()[0]
+
+    def names(self):
+        return [p["name"] for p in self.all()]
+
+    def get(self, name):
+        return self._current()[1].get(name)
+
+    def first_with(self, min_qubits):
+        """First listed processor with at least ``min_qubits`` qubits, or None."""
+        return next((p for p in self.all() if p["number of qubits"] >= min_qubits), None)
+
+    def smallest_with(self, min_qubits):
+        """Smallest processor with at least ``min_qubits`` qubits, or None."""
+        _, _, by_size, sizes = self._current()
+        i = bisect.bisect_left(sizes, min_qubits)
+        if i == len(by_size):
+            return None
+        return by_size[i]
+
+    def random(self):
+        return random.choice(self.all())
+
+
+def file_source(path):
+    def load():
+        with open(path) as f:
+            return json.load(f)
+    return load
+
+
+def mongo_source(collection, default=DEFAULT_PROCESSORS):
+    def load():
+        processors = list(collection.find())
+        return processors or default
+    return load
@@ -0,0 +1,57 @@
+"""Grover circuits of the learning module with an exactly chosen iteration count.
+
+The number of Grover iterations is taken from the exact statevector of the
+candidate circuits (computed by our statevector engine) instead of test runs
+with shots, and cached per (number of qubits, marked state).
+"""
+import numpy as np
+
+from interface.libs.cache.lru import LRUCache
+from interface.libs.simulation.facade import QuantumCircuit
+from interface.libs.simulation.statevector import probabilities
+from interface.libs.quantum_functions import templates
+
+iterations = LRUCache(maxsize=4096)
+
+
+def grover_circuit(n, omega, T):
+    """Unmeasured Grover search for ``omega`` on the first n-1 of n qubits with T iterations."""
+    phase = templates.grover_phase_oracle(n, omega)
+    inversion = templates.grover_inversion_oracle(n)
+    qc = QuantumCircuit(n, n-1)
+    qc.h(range(n-1))
+    for _ in range(T):
+        qc = QuantumCircuit.compose(qc, phase)
+        qc = QuantumCircuit.compose(qc, inversion)
+    qc.h(range(n-1))
+    return qc
+
+
+def success_probability(n, omega, T):
+    probs = probabilities(grover_circuit(n, omega, T))
+    # measurement outcomes are read with the last search qubit first
+    marked = int(omega[::-1], 2)
+    search = np.arange(len(probs)) % 2**(n-1)
+    return float(probs[search == marked].sum())
+
+
+def estimated_iterations(n):
+    """Textbook estimate pi/4 sqrt(N), shifted by one for the oracles of this module."""
+    T = np.pi*np.sqrt(2**(n-1))/4
+    T_low = np.floor(T)
+    T_high = np.ceil(T)
+    if(abs(T-T_low) <= abs(T-T_high)):
+        return max(int(T_low)-1, 0)
+    return max(int(T_high)-1, 0)
+
+
+def grover_iterations(n, omega):
+    """Iteration count with the highest probability of measuring ``omega``."""
+    key = (n, omega)
+    T = iterations.get(key)
+    if T is None:
+        estimate = estimated_iterations(n)
+        candidates = [estimate, estimate + 1, estimate + 2]
+        T = max(candidates, key=lambda t: success_probability(n, omega, t))
+        iterations.set(key, T)
+    return T
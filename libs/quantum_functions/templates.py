@@ -0,0 +1,64 @@
+"""Prebuilt sub-circuits of the learning modules.
+
+QFT blocks and the Bernstein-Vazirani, Simon and Grover oracles only depend
+on a handful of parameters, so each one is built once and shared. The
+Deutsch-Josza oracle is built per request: a balanced oracle may be drawn at
+random, and a cached one would be the same on every visit. ``QuantumCircuit.compose`` returns a new circuit, the cached templates
+must never be modified in place.
+"""
+import itertools
+
+from interface.libs.cache.lru import LRUCache
+from interface.libs.simulation.facade import (QFT_circuit,
+                                              Simon_oracle,
+                                              BV_oracle,
+                                              GroverPhaseOracle,
+                                              GroverInversionOracle)
+
+templates = LRUCache(maxsize=4096)
+
+
+def _template(key, build):
+    circuit = templates.get(key)
+    if circuit is None:
+        circuit = build()
+        templates.set(key, circuit)
+    return circuit
+
+
+def qft(n):
+    return _template(("QFT", n), lambda: QFT_circuit(n))
+
+
+def bv_oracle(code):
+    code = tuple(code)
+    return _template(("BV", code), lambda: BV_oracle(list(code)))
+
+
+def simon_oracle(code):
+    return _template(("Simon", code), lambda: Simon_oracle(code))
+
+
+def grover_phase_oracle(n, omega):
+    return _template(("GroverPhase", n, omega), lambda: GroverPhaseOracle(n, omega))
+
+
+def grover_inversion_oracle(n):
+    return _template(("GroverInversion", n), lambda: GroverInversionOracle(n))
+
+
+def _bit_strings(length):
+    return ["".join(bits) for bits in itertools.product("01", repeat=length)]
+
+
+def warm_up(processor_sizes):
+    """Build the templates every learning module can ask for on processors of the given sizes."""
+    for n in sorted(set(processor_sizes) | {2}):
+        qft(n)
+        grover_inversion_oracle(n)
+        for omega in _bit_strings(n - 1):
+            grover_phase_oracle(n, omega)
+        for code in itertools.product((0, 1), repeat=n):
+            bv_oracle(code)
+        for code in _bit_strings(int(n/2)):
+            simon_oracle(code)
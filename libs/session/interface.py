@@ -0,0 +1,178 @@
+"""Server-side sessions: the cookie only carries an opaque session id.
+
+Large session fields (``lazy_keys``, e.g. the QASM program and the processor
+of the circuit creator) are stored apart from the other fields and only read
+from the store when a request accesses them. Changes to large fields,
+including in-place changes of lists and dicts, are found by comparing with the
+loaded value when the response is sent, so only changed fields are written.
+"""
+import re
+import copy
+import secrets
+import datetime
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from interface.libs.session.store import MISSING
+
+LAZY_MARKER = "_lazy"
+_sid = re.compile(r"^[A-Za-z0-9_-]{32,64}$")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, sid, store, lazy_keys, initial=None, expires=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        initial = dict(initial or {})
+        self._stored = set(initial.pop(LAZY_MARKER, ()))
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        self._store = store
+        self._lazy_keys = set(lazy_keys)
+        self._unloaded = set(self._stored)
+        self._loaded = {}
+        self._replaced = None
+
+    def _load(self, key):
+        if key in self._unloaded:
+            self._unloaded.discard(key)
+            value = self._store.load_field(self.sid, key)
+            if value is not MISSING:
+                dict.__setitem__(self, key, value)
+                self._loaded[key] = copy.deepcopy(value)
+
+    def _load_all(self):
+        for key in list(self._unloaded):
+            self._load(key)
+
+    def __getitem__(self, key):
+        self.accessed = True
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        self._load(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.accessed = True
+        return key in self._unloaded or super().__contains__(key)
+
+    def __delitem__(self, key):
+        self._load(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        self._load(key)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return super().setdefault(key, default)
+
+    def clear(self):
+        self._unloaded.clear()
+        super().clear()
+
+    def __len__(self):
+        return super().__len__() + len(self._unloaded)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def regenerate(self):
+        """Move the session to a new id, e.g. at login; the old id is deleted from the store on save."""
+        self._load_all()
+        if not self.new and self._replaced is None:
+            self._replaced = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        # the new id has nothing stored yet, write every field
+        self._stored = set()
+        self._loaded = {}
+        self.new = True
+        self.modified = True
+
+    def small_fields(self):
+        data = {key: value for key, value in dict.items(self) if key not in self._lazy_keys}
+        data[LAZY_MARKER] = sorted(self._unloaded | {key for key in dict.keys(self) if key in self._lazy_keys})
+        return data
+
+    def changed_fields(self):
+        """Large fields to write and large fields to delete."""
+        changed = {key: value for key, value in dict.items(self)
+                   if key in self._lazy_keys and self._loaded.get(key, MISSING) != value}
+        present = self._unloaded | {key for key in dict.keys(self) if key in self._lazy_keys}
+        return changed, self._stored - present
+
+
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, store, lazy_keys=()):
+        self.store = store
+        self.lazy_keys = tuple(lazy_keys)
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(app.config["SESSION_COOKIE_NAME"])
+        if sid and _sid.match(sid):
+            stored = self.store.load(sid)
+            if stored is not None:
+                data, expires = stored
+                return ServerSideSession(sid, self.store, self.lazy_keys, data, expires)
+        return ServerSideSession(secrets.token_urlsafe(32), self.store, self.lazy_keys, new=True)
+
+    def save_session(self, app, session, response):
+        name = app.config["SESSION_COOKIE_NAME"]
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+        if session._replaced is not None:
+            self.store.delete(session._replaced)
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = datetime.datetime.utcnow()
+        expires = now + self._lifetime(app)
+        changed, removed = session.changed_fields()
+        if session.new or session.modified or changed or removed:
+            self.store.save(session.sid, session.small_fields(), changed, removed, expires)
+        elif session.expires is None or session.expires - now < self._lifetime(app)/2:
+            # sliding expiry, written at most twice per lifetime
+            self.store.touch(session.sid, expires)
+        else:
+            return
+
+        response.set_cookie(name, session.sid,
+                            expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app),
+                            domain=domain,
+                            path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
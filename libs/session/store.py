@@ -0,0 +1,179 @@
+"""Backends of the server-side session.
+
+A session is stored as a small document with the regular fields and one
+document per large field (``lazy_keys``), which is only read when a request
+uses it. All backends implement the same five methods:
+
+    load(sid)                      -> (small fields, expiry) or None if unknown/expired
+    load_field(sid, key)           -> value of a large field or MISSING
+    save(sid, data, fields, removed, expires)
+    touch(sid, expires)            -> extend the lifetime without rewriting
+    delete(sid)
+
+``MongoSessionStore`` is meant for production (expired sessions are removed
+by TTL indexes), ``FileSessionStore`` and ``MemorySessionStore`` for a single
+local process.
+"""
+import os
+import copy
+import datetime
+import threading
+
+from flask.json.tag import TaggedJSONSerializer
+from pymongo import ReplaceOne, DeleteOne
+
+MISSING = object()
+
+
+class MongoSessionStore:
+    def __init__(self, db):
+        self.sessions = db.sessions
+        self.fields = db.session_fields
+
+    def load(self, sid):
+        document = self.sessions.find_one({"_id": sid, "expires": {"$gt": datetime.datetime.utcnow()}})
+        return (document["data"], document["expires"]) if document else None
+
+    def load_field(self, sid, key):
+        document = self.fields.find_one({"_id": "{}:{}".format(sid, key)}, {"value": 1})
+        return document["value"] if document else MISSING
+
+    def save(self, sid, data, fields, removed, expires):
+        self.sessions.replace_one({"_id": sid}, {"_id": sid, "data": data, "expires": expires}, upsert=True)
+        operations = [ReplaceOne({"_id": "{}:{}".format(sid, key)},
+                                 {"_id": "{}:{}".format(sid, key), "sid": sid, "value": value, "expires": expires},
+                                 upsert=True)
+                      for key, value in fields.items()]
+        operations += [DeleteOne({"_id": "{}:{}".format(sid, key)}) for key in removed]
+        if operations:
+            self.fields.bulk_write(operations, ordered=False)
+
+    def touch(self, sid, expires):
+        self.sessions.update_one({"_id": sid}, {"$set": {"expires": expires}})
+        self.fields.update_many({"sid": sid}, {"$set": {"expires": expires}})
+
+    def delete(self, sid):
+        self.sessions.delete_one({"_id": sid})
+        self.fields.delete_many({"sid": sid})
+
+
+def _timestamp(expires):
+    """POSIX timestamp of a naive UTC datetime."""
+    return expires.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class MemorySessionStore:
+    """Sessions in a dict of this process; values are copied like a serializing store would."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _get(self, sid):
+        entry = self._sessions.get(sid)
+        if entry is None:
+            return None
+        if entry["expires"] <= datetime.datetime.utcnow():
+            del self._sessions[sid]
+            return None
+        return entry
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._get(sid)
+            return (copy.deepcopy(entry["data"]), entry["expires"]) if entry else None
+
+    def load_field(self, sid, key):
+        with self._lock:
+            entry = self._get(sid)
+            if entry is None or key not in entry["fields"]:
+                return MISSING
+            return copy.deepcopy(entry["fields"][key])
+
+    def save(self, sid, data, fields, removed, expires):
+        with self._lock:
+            entry = self._sessions.setdefault(sid, {"fields": {}})
+            entry["data"] = copy.deepcopy(data)
+            entry["expires"] = expires
+            entry["fields"].update(copy.deepcopy(fields))
+            for key in removed:
+                entry["fields"].pop(key, None)
+
+    def touch(self, sid, expires):
+        with self._lock:
+            if sid in self._sessions:
+                self._sessions[sid]["expires"] = expires
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+
+class FileSessionStore:
+    """One directory per session with a JSON file per document, for development servers.
+
+    ``expires`` is written as a POSIX timestamp: the tagged JSON serializer
+    would read a datetime back as timezone-aware, and the session interface
+    works with naive UTC datetimes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.serializer = TaggedJSONSerializer()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, sid, name):
+        return os.path.join(self.path, sid, name + ".json")
+
+    def _read(self, sid, name):
+        try:
+            with open(self._file(sid, name)) as f:
+                return self.serializer.loads(f.read())
+        except (OSError, ValueError):
+            return MISSING
+
+    def _write(self, sid, name, value):
+        target = self._file(sid, name)
+        with open(target + ".tmp", "w") as f:
+            f.write(self.serializer.dumps(value))
+        os.replace(target + ".tmp", target)
+
+    def load(self, sid):
+        document = self._read(sid, "session")
+        if document is MISSING:
+            return None
+        if not isinstance(document["expires"], (int, float)):
+            # written with a datetime expiry by an older version
+            self.delete(sid)
+            return None
+        expires = datetime.datetime.utcfromtimestamp(document["expires"])
+        if expires <= datetime.datetime.utcnow():
+            self.delete(sid)
+            return None
+        return document["data"], expires
+
+    def load_field(self, sid, key):
+        return self._read(sid, "field-" + key)
+
+    def save(self, sid, data, fields, removed, expires):
+        os.makedirs(os.path.join(self.path, sid), exist_ok=True)
+        for key, value in fields.items():
+            self._write(sid, "field-" + key, value)
+        for key in removed:
+            try:
+                os.remove(self._file(sid, "field-" + key))
+            except OSError:
+                pass
+        self._write(sid, "session", {"data": data, "expires": _timestamp(expires)})
+
+    def touch(self, sid, expires):
+        document = self._read(sid, "session")
+        if document is not MISSING:
+            self._write(sid, "session", dict(document, expires=_timestamp(expires)))
+
+    def delete(self, sid):
+        directory = os.path.join(self.path, sid)
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
@@ -0,0 +1,80 @@
+"""Benchmark of the statevector engine against Aer.
+
+Both engines run the same circuits; besides the timings the report checks
+that the counts of both engines use the same keys. The statevector engine is
+timed without ``result_cache``, otherwise the repeats would only measure
+cache hits. ``noise_amortization``
+shows the one-off cost of building a noisy simulator against its per-job cost.
+"""
+import time
+
+import numpy as np
+
+from interface.libs.simulation.facade import QuantumCircuit
+from interface.libs.simulation.execution import simulate, simulate_many, AER, STATEVECTOR, NOISY, SHOTS
+from interface.libs.simulation import noise, statevector
+
+
+def benchmark_circuits(sizes=(3, 4, 8), seed=1):
+    """Superposition, GHZ and random layered circuits of the given sizes."""
+    rng = np.random.default_rng(seed)
+    circuits = {}
+    for n in sizes:
+        qc = QuantumCircuit(n, n)
+        qc.h(range(n))
+        qc.measure(range(n), range(n))
+        circuits["superposition-{}".format(n)] = qc
+
+        qc = QuantumCircuit(n, n)
+        qc.h(0)
+        for i in range(n-1):
+            qc.cx(i, i+1)
+        qc.measure(range(n), range(n))
+        circuits["GHZ-{}".format(n)] = qc
+
+        qc = QuantumCircuit(n, n)
+        for _ in range(4*n):
+            q = int(rng.integers(n))
+            qc.rx(float(rng.random()*np.pi), q)
+            qc.cx(q, (q + 1) % n)
+        qc.measure(range(n), range(n))
+        circuits["random-{}".format(n)] = qc
+    return {name: qc.qasm().splitlines() for name, qc in circuits.items()}
+
+
+def run(repeats=5, shots=SHOTS):
+    """Mean runtime in seconds per circuit and engine, and whether the counts formats agree."""
+    report = []
+    for name, instructions in benchmark_circuits().items():
+        row = {"circuit": name}
+        counts = {}
+        for engine, run_engine in ((AER, lambda: simulate(instructions, shots, AER)),
+                                   (STATEVECTOR, lambda: statevector.simulate(instructions, shots))):
+            run_engine()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                counts[engine] = run_engine()
+            row[engine] = (time.perf_counter() - start)/repeats
+        row["same format"] = ({len(key) for key in counts[AER]} == {len(key) for key in counts[STATEVECTOR]}
+                              and sum(counts[AER].values()) == sum(counts[STATEVECTOR].values()))
+        report.append(row)
+    return report
+
+
+def noise_amortization(processor, batch_sizes=(1, 10, 50), shots=SHOTS):
+    """Time to build the noisy simulator of ``processor`` and the mean time per job for each batch size."""
+    instructions = benchmark_circuits(sizes=(processor["number of qubits"],))
+    instructions = list(instructions.values())
+    noise.backends.clear()
+    start = time.perf_counter()
+    noise.backend_for(processor)
+    build = time.perf_counter() - start
+    report = []
+    for size in batch_sizes:
+        batch = [instructions[i % len(instructions)] for i in range(size)]
+        start = time.perf_counter()
+        simulate_many(batch, shots, NOISY, processor)
+        report.append({"batch": size,
+                       "build": build,
+                       "per job": (time.perf_counter() - start)/size})
+    return report
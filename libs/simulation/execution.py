@@ -0,0 +1,72 @@
+from interface.libs.simulation.facade import (QuantumCircuit,
+                                              execute,
+                                              Aer)
+from interface.libs.simulation import statevector, result_cache, noise
+
+SHOTS = 1000
+
+AER = "aer"
+STATEVECTOR = "statevector"
+NOISY = "noisy"
+ENGINES = (AER, STATEVECTOR, NOISY)
+
+default_engine = STATEVECTOR
+processor_engines = {}
+
+
+def configure(default, per_processor=None):
+    """Select the simulation engine, globally and per processor name."""
+    global default_engine, processor_engines
+    for engine in [default] + list((per_processor or {}).values()):
+        if engine not in ENGINES:
+            raise ValueError("Unknown simulation engine {}".format(engine))
+    default_engine = default
+    processor_engines = dict(per_processor or {})
+
+
+def engine_for(processor_name):
+    return processor_engines.get(processor_name, default_engine)
+
+
+def has_measurement(instructions):
+    return "\n".join(instructions).find("measure") != -1
+
+
+def _backend(engine, processor):
+    if engine == NOISY and processor is not None:
+        return noise.backend_for(processor)
+    return Aer.get_backend('qasm_simulator')
+
+
+def simulate(instructions, shots=SHOTS, engine=AER, processor=None):
+    """Simulate an OpenQASM instruction list and return its counts.
+
+    The statevector engine draws from cached distributions of repeated
+    circuits and hands circuits it does not support over to Aer. The noisy
+    engine needs the ``processor`` whose noise it simulates.
+    """
+    if engine == STATEVECTOR:
+        try:
+            return result_cache.simulate(instructions, shots)
+        except statevector.UnsupportedCircuit:
+            pass
+    circuit = QuantumCircuit.from_qasm_str("\n".join(instructions))
+    backend = _backend(engine, processor)
+    ex = execute(circuit, backend, shots=shots)
+    return ex.result().get_counts()
+
+
+def simulate_many(instruction_lists, shots=SHOTS, engine=AER, processor=None):
+    """Simulate several instruction lists, on Aer as one multi-circuit job.
+
+    Returns the counts in the order of ``instruction_lists``.
+    """
+    if engine == STATEVECTOR:
+        return [simulate(instructions, shots, engine) for instructions in instruction_lists]
+    circuits = [QuantumCircuit.from_qasm_str("\n".join(instructions))
+                for instructions in instruction_lists]
+    if not circuits:
+        return []
+    backend = _backend(engine, processor)
+    results = execute(circuits, backend, shots=shots).result()
+    return [results.get_counts(i) for i in range(len(circuits))]
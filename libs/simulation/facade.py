@@ -0,0 +1,60 @@
+"""Deferred access to qiskit and the quantum function libraries.
+
+Importing qiskit (and matplotlib through it) takes seconds, so the web
+application only imports the names below. The underlying modules are imported
+on first use and the time it took is recorded in ``import_times``.
+"""
+import sys
+import time
+import importlib
+import threading
+
+import_times = {}
+_lock = threading.Lock()
+
+
+def load_module(module_name):
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with _lock:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_times.setdefault(module_name, time.perf_counter() - start)
+    return module
+
+
+class Deferred:
+    """Stand-in for ``module_name.name`` that imports the module on first use."""
+
+    def __init__(self, module_name, name):
+        self._module_name = module_name
+        self._name = name
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            self._target = getattr(load_module(self._module_name), self._name)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return "<deferred {}.{}>".format(self._module_name, self._name)
+
+
+QuantumCircuit = Deferred("qiskit", "QuantumCircuit")
+execute = Deferred("qiskit", "execute")
+Aer = Deferred("qiskit", "Aer")
+
+QFT_circuit = Deferred("interface.libs.quantum_functions.QFT", "QFT_circuit")
+Simon_oracle = Deferred("interface.libs.quantum_functions.oracles", "Simon_oracle")
+BV_oracle = Deferred("interface.libs.quantum_functions.oracles", "BV_oracle")
+DeutschJoszaOracle = Deferred("interface.libs.quantum_functions.oracles", "DeutschJoszaOracle")
+GroverPhaseOracle = Deferred("interface.libs.quantum_functions.oracles", "GroverPhaseOracle")
+GroverInversionOracle = Deferred("interface.libs.quantum_functions.oracles", "GroverInversionOracle")
+Shor_Kitaev = Deferred("interface.libs.quantum_functions.Shor", "Shor_Kitaev")
@@ -0,0 +1,74 @@
+"""Noisy simulation from the specification of our processors.
+
+The noise model of a processor is derived from its ``available_processors``
+entry:
+
+* readout errors from "Fidelity 0" and "Fidelity 1",
+* depolarizing errors matching "Fidelity X" (single-qubit gates) and
+  "Fidelity CX" (two-qubit gates),
+* thermal relaxation with "T1 (in sec)" and "T2 (in sec)" during a gate, whose
+  duration is taken to be one circuit layer, i.e. 1/CLOPS seconds.
+
+Noise model and configured simulator are built once per processor and kept in
+``backends`` for the lifetime of the process.
+"""
+from interface.libs.cache.lru import LRUCache
+from interface.libs.simulation.facade import Deferred
+
+NoiseModel = Deferred("qiskit_aer.noise", "NoiseModel")
+ReadoutError = Deferred("qiskit_aer.noise", "ReadoutError")
+depolarizing_error = Deferred("qiskit_aer.noise", "depolarizing_error")
+thermal_relaxation_error = Deferred("qiskit_aer.noise", "thermal_relaxation_error")
+AerSimulator = Deferred("qiskit_aer", "AerSimulator")
+
+SINGLE_QUBIT_GATES = ["u1", "u2", "u3", "x", "y", "z", "h", "s", "sdg", "t", "tdg",
+                      "rx", "ry", "rz", "sx", "id"]
+TWO_QUBIT_GATES = ["cx"]
+
+backends = LRUCache(maxsize=64)
+
+
+def _depolarizing(fidelity, num_qubits):
+    # average gate fidelity of the depolarizing channel is 1 - p(d-1)/d
+    d = 2**num_qubits
+    p = (1 - fidelity)*d/(d - 1)
+    return depolarizing_error(min(max(p, 0.0), 1.0), num_qubits)
+
+
+def noise_model(processor):
+    gate_time = 1/processor["CLOPS"]
+    t1 = processor["T1 (in sec)"]
+    t2 = min(processor["T2 (in sec)"], 2*t1)
+    relaxation = thermal_relaxation_error(t1, t2, gate_time)
+
+    model = NoiseModel()
+    single = _depolarizing(processor["Fidelity X"], 1).compose(relaxation)
+    model.add_all_qubit_quantum_error(single, SINGLE_QUBIT_GATES)
+    double = _depolarizing(processor["Fidelity CX"], 2).compose(relaxation.expand(relaxation))
+    model.add_all_qubit_quantum_error(double, TWO_QUBIT_GATES)
+    f0, f1 = processor["Fidelity 0"], processor["Fidelity 1"]
+    model.add_all_qubit_readout_error(ReadoutError([[f0, 1 - f0], [1 - f1, f1]]))
+    return model
+
+
+NOISE_PARAMETERS = ("name", "CLOPS", "T1 (in sec)", "T2 (in sec)",
+                    "Fidelity 0", "Fidelity 1", "Fidelity X", "Fidelity CX")
+
+
+def _processor_key(processor):
+    return tuple(processor[key] for key in NOISE_PARAMETERS)
+
+
+def backend_for(processor):
+    """Simulator configured with the noise of ``processor``, built on first use."""
+    key = _processor_key(processor)
+    backend = backends.get(key)
+    if backend is None:
+        backend = AerSimulator(noise_model=noise_model(processor))
+        backends.set(key, backend)
+    return backend
+
+
+def warm_up(processors):
+    for processor in processors:
+        backend_for(processor)
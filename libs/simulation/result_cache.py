@@ -0,0 +1,43 @@
+"""Cache of simulated outcome distributions.
+
+The learning modules submit the same few circuits over and over. Their exact
+outcome distribution is kept per canonical QASM, shots and seed; a hit draws
+fresh counts from the cached distribution, so every student still sees fresh
+shot noise.
+"""
+import hashlib
+
+from interface.libs.cache.lru import LRUCache
+from interface.libs.artifacts.store import normalize_qasm
+from interface.libs.simulation.facade import QuantumCircuit
+from interface.libs.simulation.statevector import distribution
+
+cache = LRUCache(maxsize=512, ttl=3600)
+
+
+def configure(maxsize, ttl):
+    global cache
+    cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+def canonical_qasm(instructions):
+    """QASM program without comments, redundant whitespace and its header lines."""
+    lines = normalize_qasm("\n".join(instructions)).splitlines()
+    return "\n".join(line for line in lines
+                     if not line.startswith("OPENQASM") and not line.startswith("include"))
+
+
+def result_key(instructions, shots, seed=None):
+    payload = "{}\n{}\n{}".format(canonical_qasm(instructions), shots, seed)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def simulate(instructions, shots, seed=None):
+    """Counts of ``shots`` runs, drawn from a cached distribution when possible."""
+    key = result_key(instructions, shots, seed)
+    outcomes = cache.get(key)
+    if outcomes is None:
+        circuit = QuantumCircuit.from_qasm_str("\n".join(instructions))
+        outcomes = distribution(circuit)
+        cache.set(key, outcomes)
+    return outcomes.sample(shots, seed)
@@ -0,0 +1,132 @@
+"""NumPy statevector engine for the small circuits of our processors.
+
+Gates are applied to a dense statevector of at most ``MAX_QUBITS`` qubits and
+all shots are drawn at once with ``Generator.multinomial``. Counts use the
+format of the qiskit simulators: one bit string per classical register, most
+significant clbit first, registers separated by spaces in reverse order of
+declaration, zero counts left out.
+
+Circuits with mid-circuit measurements, resets or classically conditioned
+gates raise ``UnsupportedCircuit`` and have to run on Aer.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from interface.libs.simulation.facade import QuantumCircuit
+
+MAX_QUBITS = 16
+
+_ignored = {"barrier", "id", "delay"}
+
+
+class UnsupportedCircuit(Exception):
+    pass
+
+
+def _apply(state, matrix, qubits, num_qubits):
+    """Apply ``matrix`` (qiskit ordering, first qubit least significant) to the ``qubits`` of ``state``."""
+    k = len(qubits)
+    gate = np.reshape(matrix, [2]*(2*k))
+    # axis of qubit q in the state tensor is num_qubits-1-q, gate axes run from qubits[k-1] to qubits[0]
+    state_axes = [num_qubits - 1 - qubits[k - 1 - j] for j in range(k)]
+    state = np.tensordot(gate, state, axes=(list(range(k, 2*k)), state_axes))
+    return np.moveaxis(state, list(range(k)), state_axes)
+
+
+def _apply_instruction(state, instruction, targets, num_qubits, measured):
+    if instruction.name in _ignored:
+        return state
+    if instruction.name == "measure":
+        raise UnsupportedCircuit("measurement inside a gate definition")
+    if instruction.name == "reset" or getattr(instruction, "condition", None):
+        raise UnsupportedCircuit("{} is not supported".format(instruction.name))
+    if measured.intersection(targets):
+        raise UnsupportedCircuit("gate after measurement")
+    try:
+        matrix = instruction.to_matrix()
+    except Exception:
+        # composite gate, e.g. a `gate` declared in the QASM file
+        definition = instruction.definition
+        if definition is None:
+            raise UnsupportedCircuit("no matrix for {}".format(instruction.name))
+        indices = {bit: i for i, bit in enumerate(definition.qubits)}
+        for inner, qargs, _ in definition.data:
+            state = _apply_instruction(state, inner, [targets[indices[q]] for q in qargs],
+                                       num_qubits, measured)
+        return state
+    return _apply(state, matrix, targets, num_qubits)
+
+
+def final_state(circuit):
+    """Statevector of ``circuit`` (ignoring its final measurements) and the measured qubit -> clbit pairs."""
+    num_qubits = circuit.num_qubits
+    if num_qubits > MAX_QUBITS:
+        raise UnsupportedCircuit("{} qubits".format(num_qubits))
+    state = np.zeros([2]*num_qubits, dtype=complex)
+    state[(0,)*num_qubits] = 1
+    qubit_index = {bit: i for i, bit in enumerate(circuit.qubits)}
+    clbit_index = {bit: i for i, bit in enumerate(circuit.clbits)}
+    measured = set()
+    measurements = []
+    for instruction, qargs, cargs in circuit.data:
+        if instruction.name == "measure":
+            if getattr(instruction, "condition", None):
+                raise UnsupportedCircuit("conditional measurement")
+            q = qubit_index[qargs[0]]
+            measured.add(q)
+            measurements.append((q, clbit_index[cargs[0]]))
+            continue
+        state = _apply_instruction(state, instruction, [qubit_index[q] for q in qargs],
+                                   num_qubits, measured)
+    return state.reshape(-1), measurements
+
+
+def probabilities(circuit):
+    """Probabilities of the computational basis states of ``circuit``, qubit 0 least significant."""
+    state, _ = final_state(circuit)
+    probs = np.abs(state)**2
+    return probs/probs.sum()
+
+
+def _format_key(clbits, registers):
+    words = []
+    for register in reversed(registers):
+        words.append("".join(str(clbits[i]) for i in reversed(register)))
+    return " ".join(words)
+
+
+@dataclass
+class Distribution:
+    """Outcome probabilities of a circuit and how to read them out into its clbits."""
+    probs: np.ndarray
+    measurements: list
+    registers: list
+    num_clbits: int
+
+    def sample(self, shots, seed=None):
+        """Counts of ``shots`` measurements, drawn at once."""
+        rng = np.random.default_rng(seed)
+        samples = rng.multinomial(shots, self.probs)
+        counts = {}
+        for index in np.flatnonzero(samples):
+            clbits = [0]*self.num_clbits
+            for q, c in self.measurements:
+                clbits[c] = (int(index) >> q) & 1
+            key = _format_key(clbits, self.registers)
+            counts[key] = counts.get(key, 0) + int(samples[index])
+        return counts
+
+
+def distribution(circuit):
+    state, measurements = final_state(circuit)
+    probs = np.abs(state)**2
+    clbit_index = {bit: i for i, bit in enumerate(circuit.clbits)}
+    registers = [[clbit_index[bit] for bit in register] for register in circuit.cregs]
+    return Distribution(probs/probs.sum(), measurements, registers, circuit.num_clbits)
+
+
+def simulate(instructions, shots, seed=None):
+    """Counts of ``shots`` measurements, without the cache of ``result_cache``."""
+    circuit = QuantumCircuit.from_qasm_str("\n".join(instructions))
+    return distribution(circuit).sample(shots, seed)
@@ -0,0 +1,29 @@
+"""Start-up time report.
+
+Each module is imported in a fresh interpreter, in the order given, so the
+time attributed to a module excludes what earlier modules already loaded.
+"""
+import sys
+import subprocess
+
+WEB_MODULES = ["flask", "pymongo", "numpy", "interface"]
+HEAVY_MODULES = ["qiskit", "matplotlib.pyplot", "qiskit.visualization"]
+
+_SCRIPT = """
+import sys, time, importlib
+for name in sys.argv[1:]:
+    start = time.perf_counter()
+    importlib.import_module(name)
+    print(name, time.perf_counter() - start, flush=True)
+"""
+
+
+def import_times(modules):
+    """Cold import time in seconds of each of ``modules``, imported one after the other."""
+    output = subprocess.run([sys.executable, "-c", _SCRIPT] + list(modules),
+                            capture_output=True, text=True, check=True).stdout
+    times = {}
+    for line in output.splitlines():
+        name, seconds = line.rsplit(" ", 1)
+        times[name] = float(seconds)
+    return times
@@ -0,0 +1,42 @@
+"""Cached user lookups.
+
+The user of a request is memoized on ``flask.g``; across requests user
+documents are kept in a small per-process TTL/LRU cache. Routes that change a
+user document must call ``invalidate`` with the user's email. ``invalidate``
+only reaches the cache of its own process, so checks of passwords and of the
+confirmation pass ``fresh=True`` and read the stored document.
+"""
+from flask import current_app, g, session
+
+from interface.libs.cache.lru import LRUCache
+from interface.model import User
+
+cache = LRUCache(maxsize=4096, ttl=60)
+
+
+def configure(maxsize, ttl):
+    global cache
+    cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+
+def get_user_by_email(email, fresh=False):
+    """The ``User`` registered with ``email`` or None; ``fresh`` bypasses the cache."""
+    user_data = None if fresh else cache.get(email)
+    if user_data is None:
+        user_data = current_app.db.user.find_one({"email": email})
+        if not user_data:
+            return None
+        cache.set(email, user_data)
+    return User(**user_data)
+
+
+def current_user(fresh=False):
+    """The ``User`` of the session, loaded at most once per request."""
+    if "user" not in g or fresh:
+        g.user = get_user_by_email(session["email"], fresh)
+    return g.user
+
+
+def invalidate(email):
+    cache.pop(email)
+    g.pop("user", None)
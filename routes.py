@@ -2,31 +2,46 @@ import os, sys, shutil
 from itsdangerous import URLSafeTimedSerializer
 from flask import (Blueprint, Flask, Markup, 
                    current_app, session, request, 
-                   url_for, redirect, render_template, send_file, flash, abort)
+                   url_for, redirect, render_template, send_file, flash, abort,
+                   jsonify, Response, stream_with_context)
 import uuid, datetime, functools
 from dataclasses import asdict
-from werkzeug.utils import secure_filename
 from passlib.hash import pbkdf2_sha256
-from qiskit import (QuantumCircuit, 
-                    execute, 
-                    Aer)
-from qiskit.visualization import plot_histogram
 import numpy as np
 import unicodedata
 
 sys.path.append("./")
-from interface.libs.transpiler.Transpiler import QASM_transpiler, QASM_Pulse_Transpiler
+from interface.libs.cache.transpiler import verbose_instructions, pulse_instructions
+import interface.libs.cache.transpiler as transpiler_cache
 from interface.libs.transpiler.operations import Operations
-from interface.libs.quantum_functions.QFT import QFT_circuit
-from interface.libs.quantum_functions.oracles import (Simon_oracle,
-                                                        BV_oracle,
-                                                        DeutschJoszaOracle,
-                                                        GroverPhaseOracle,
-                                                        GroverInversionOracle)
-from interface.libs.quantum_functions.Shor import Shor_Kitaev
+from interface.libs.simulation.facade import QuantumCircuit, Shor_Kitaev, DeutschJoszaOracle
+from interface.libs.quantum_functions import templates
+from interface.libs.quantum_functions.grover import grover_circuit, grover_iterations
 from interface.libs.user.Category import CategoryText
-import interface.libs.email.email as email
+from interface.libs.user.cache import current_user, get_user_by_email, invalidate as invalidate_user
+import interface.libs.user.cache as user_cache
+from interface.libs.artifacts.figures import circuit_svg, histogram_svg
+from interface.libs.circuits.editor import CircuitEditor
+from interface.libs.email import outbox
+from interface.libs.simulation.execution import simulate, has_measurement, engine_for, SHOTS
+from interface.libs.simulation import result_cache
+from interface.libs.jobs.worker import claim_job, fail_job, finish_job, evaluate_open_jobs, notify_processed
+from interface.libs.jobs.listing import open_jobs_page, processed_jobs_page
+from interface.libs.jobs.eta import (wait_seconds,
+                                     pending_seconds,
+                                     format_duration)
+from interface.libs.jobs.scheduler import QuotaExceeded
+from interface.libs.jobs.submission import (submit_jobs,
+                                            submit_within_quota,
+                                            build_jobs,
+                                            read_uploads,
+                                            parse_qasm,
+                                            InvalidCircuit)
+from interface.libs.jobs import status as job_status
+from interface.libs.jobs.documents import (load as load_document,
+                                           stored_verbose)
 from interface.forms import (RegisterForm, LoginForm, ExperimentForm)
+from flask_wtf.csrf import generate_csrf, validate_csrf, ValidationError
 from interface.model import User, Experiment, Result
 
 pages = Blueprint("pages",
@@ -61,46 +76,20 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-available_processors = [{"name":"Trick",
-               "number of qubits": 8,
-               "Quantum Volume": 32,
-               "CLOPS": 3000,
-               "T1 (in sec)": 5,
-               "T2 (in sec)": 3,
-               "T2* (in sec)": 2.5,
-               "Fidelity 0": 0.99,
-               "Fidelity 1": 0.98,
-               "Fidelity X": 0.96,
-               "Fidelity CX": 0.92,
-
-               },
-              {"name":"Tick",
-               "number of qubits": 4,
-               "Quantum Volume": 20,
-               "CLOPS": 5000,
-               "T1 (in sec)": 12,
-               "T2 (in sec)": 10,
-               "T2* (in sec)": 7.5,
-               "Fidelity 0": 0.999,
-               "Fidelity 1": 0.989,
-               "Fidelity X": 0.969,
-               "Fidelity CX": 0.95
-               }, 
-               {"name":"Track",
-               "number of qubits": 3,
-               "Quantum Volume": 15,
-               "CLOPS": 1000,
-               "T1 (in sec)": 2,
-               "T2 (in sec)": 1.25,
-               "T2* (in sec)": 1.125,
-               "Fidelity 0": 0.90,
-               "Fidelity 1": 0.89,
-               "Fidelity X": 0.84,
-               "Fidelity CX": 0.72
-               }]
-
 operations = Operations()
 
+def processor_with_qubits(min_qubits):
+    """First listed processor with at least ``min_qubits`` qubits, a random one if none is big enough."""
+    processor = current_app.processors.first_with(min_qubits)
+    if processor is None:
+        processor = current_app.processors.random()
+    return dict(processor)
+
+def submit_job(job):
+    """Put ``job`` into the queue of its processor; raises QuotaExceeded."""
+    return submit_jobs(current_app.db, current_app.scheduler, [job],
+                       is_admin=bool(session.get("is_admin")))[0]
+
 def login_required(route):
     @functools.wraps(route)
     def route_wrapper(*args, **kwargs):
@@ -125,6 +114,16 @@ def admin_required(route):
         return(route(*args, **kwargs))
     return route_wrapper
 
+@pages.errorhandler(QuotaExceeded)
+def quota_exceeded(error):
+    flash(str(error), category="danger")
+    return redirect(url_for(".job_inspector"))
+
+@pages.errorhandler(413)
+def upload_too_large(error):
+    flash("The upload is larger than {} bytes".format(current_app.config["UPLOAD_MAX_BYTES"]), category="danger")
+    return redirect(url_for(".job_creator"))
+
 ## Main SaxonQ-Application Pages
 # admin functions
 @pages.route("/admin")
@@ -141,75 +140,75 @@ def process_job_admin():
     for job in job_data:
         job["date"] = "{} at {} (CET)".format(job["date"].strftime("%d %B %Y"),
                                           job["date"].strftime("%H:%M:%S "))
-        jobs.append(Experiment(**job))
+        jobs.append(load_document(Experiment, job))
     return render_template("application/admin_open_jobs.html",
                            title="SaxonQ -- Admin OpenJobs",
-                           jobs=jobs)
+                           jobs=jobs,
+                           csrf_token=generate_csrf())
 
 @pages.route("/admin/process_job/evaluating/<string:_jobID>")
 @admin_required
 def process_job_admin_eval(_jobID: str):
+    # manual evaluation; regular processing is done by the worker (`flask worker`)
     job_data = current_app.db.open_jobs.find_one({"_id": _jobID})
     if not job_data:
         abort(404)    
-    job = asdict(Experiment(**job_data))
-    instro = str("\n".join(job["instructions"]))
-    if(instro.find("measure") == -1):
+    # claimed like the worker does, so a job is never finished twice
+    if not claim_job(current_app.db, job_data, "admin"):
+        flash("The job is already being processed", category="danger")
+        return redirect(url_for('.process_job_admin'))
+    job = asdict(load_document(Experiment, job_data))
+    if not has_measurement(job["instructions"]):
         flash("A job needs to have at least one measure instruction", category="danger")
-        current_app.db.open_jobs.delete_one({"_id": _jobID})
+        fail_job(current_app.db, job_data, "A job needs to have at least one measure instruction")
         return redirect(url_for('.process_job_admin'))
-    circuit = QuantumCircuit.from_qasm_str(instro)
-    backend = Aer.get_backend('qasm_simulator')
-    ex = execute(circuit, backend, shots=1000)
-    results = ex.result()
-    count = results.get_counts()
-    result = Result(_id=uuid.uuid4().hex,
-                user_id=job["user_id"],
-                open_id=job["_id"],
-                processor=job["processor"],
-                category=job['category'],
-                params=job['params'],
-                instructions=job["instructions"],
-                result = count,
-                date_submit = job["date"], 
-                date_finish = datetime.datetime.today())
-    current_app.db.processed_jobs.insert_one(asdict(result)) 
-    current_app.db.open_jobs.delete_one({"_id": _jobID})  
-    job_url = url_for(".processedjob",_jobID=result._id, _external=True)
-    html = render_template("notifications/notification_job_processed.html", job_url=job_url)
-    subject = "SaxonQ: Your job has been processed"
-    user_data = current_app.db.user.find_one({"_id": job["user_id"]})
-    if(user_data and not session.get("is_admin")):
-        user = User(**user_data)
-        email.send_message(user.email, subject, html)
+    try:
+        count = simulate(job["instructions"], SHOTS, engine_for(job["processor"]["name"]), job["processor"])
+    except Exception as error:
+        fail_job(current_app.db, job_data, error)
+        flash("The job could not be simulated: {}".format(error), category="danger")
+        return redirect(url_for('.process_job_admin'))
+    result = finish_job(current_app.db, job_data, count)
+    notify_processed(current_app._get_current_object(), result)
     flash("Job has been processed", "success")
     return redirect(url_for(".process_job_admin"))
 
+@pages.route("/admin/process_job/evaluating_all", methods=["POST"])
+@admin_required
+def process_all_jobs_admin():
+    try:
+        validate_csrf(request.form.get("csrf_token"))
+    except ValidationError:
+        abort(400)
+    job_data = current_app.db.open_jobs.find()
+    results, dropped = evaluate_open_jobs(current_app.db, list(job_data))
+    app = current_app._get_current_object()
+    for result in results:
+        notify_processed(app, result)
+    if dropped:
+        flash(f"{len(dropped)} jobs without a measure instruction or with an invalid circuit have failed",
+              category="danger")
+    flash(f"{len(results)} jobs have been processed", "success")
+    return redirect(url_for(".process_job_admin"))
+
 @pages.route("/admin/process_job/<string:_jobID>")
 @admin_required
 def process_openjob(_jobID: str):
     job_data = current_app.db.open_jobs.find_one({"_id": _jobID})
     if not job_data:
         abort(404)    
-    job = asdict(Experiment(**job_data))
+    job = asdict(load_document(Experiment, job_data))
     job["date"] = "{} at {} (CET)".format(job["date"].strftime("%d %B %Y"),
                                           job["date"].strftime("%H:%M:%S "))
-    transpile = QASM_transpiler(job["instructions"])
-    transpile.extract_instructions()
-    instructions_verbose = transpile.instruction.splitlines()
-    job["instructions_verbose"] = instructions_verbose
-    jobs_in_line = current_app.db.open_jobs.find({"processor.name": job["processor"]["name"]})
-    job["jobs in line"] = -1
-    for i in jobs_in_line:
-        job["jobs in line"] += 1
+    job["instructions_verbose"] = stored_verbose(job_data)
+    # open jobs besides this one
+    depth = current_app.queue_depth.depth(current_app.db, job["processor"]["name"])
+    job["jobs in line"] = max(depth - 1, 0)
+    job["estimated wait"] = format_duration(wait_seconds(current_app.db, job_data))
     instro = str("\n".join(job["instructions"]))
     if(instro.find("measure") == -1):
         flash("This job does not measure anything", category="danger")
-    circuit = QuantumCircuit.from_qasm_str(instro)
-    image = circuit.draw(output='mpl')
-    f_path = session["file_path"] + '/tmp/' + "figure.svg"
-    image.savefig(f_path)
-    svg = open(f_path).read()
+    svg = circuit_svg(instro)
     category_text = CategoryText(status='open', category=job['category'], params=job['params'])
     return render_template("application/admin_process_open_job.html", 
                            job=job, 
@@ -218,6 +217,23 @@ def process_openjob(_jobID: str):
                            title="SaxonQ -- Admin Process Open Job")
 
 
+@pages.route("/admin/cache_stats")
+@admin_required
+def cache_stats():
+    return jsonify({"transpiler": transpiler_cache.stats(),
+                    "user": user_cache.cache.stats(),
+                    "templates": templates.templates.stats(),
+                    "simulation": result_cache.cache.stats()})
+
+@pages.route("/admin/processors/reload", methods=["POST"])
+@admin_required
+def reload_processors():
+    current_app.processors.reload()
+    flash("Reloaded {} processors in this server process; other processes reload after "
+          "PROCESSORS_RELOAD_INTERVAL".format(len(current_app.processors.all())), category="success")
+    return redirect(url_for(".admin_site"))
+
+
 @pages.route("/admin/QST", methods=["GET", "POST"])
 @admin_required
 def QST():
@@ -257,15 +273,15 @@ def choose_processor_admin():
     session["QASM"] = False
     if request.method == "POST":
         processor_name = request.form.get("processor")
-        for p in available_processors:
-            if(p["name"] == processor_name):
-                session["processor"] = p
+        processor = current_app.processors.get(processor_name)
+        if processor:
+            session["processor"] = dict(processor)
                     
         return redirect(url_for(".choose_maintenance"))
-    processors = available_processors
+    processors = current_app.processors.all()
     choices = [processor["name"] for processor in processors]
     return render_template("application/choose_processor.html",
-                            processors=available_processors,
+                            processors=processors,
                             choices=choices,
                             title="SaxonQ -- Choose Processor")
 
@@ -293,10 +309,9 @@ def choose_maintenance():
 def home():
     if not session["email"]:
         return redirect(url_for(".login"))
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    if not user_data:
+    user = current_user(fresh=True)
+    if not user:
         return redirect(url_for(".register"))
-    user = User(**user_data)
     if( not user.is_confirmed):
         return render_template("user_management/inactive.html")
     session["file_path"] = os.getcwd() + '/user/' + str(user._id)
@@ -310,42 +325,61 @@ def home():
 @login_required
 def job_creator():
     form = ExperimentForm()
-    processors = available_processors
-    choices = [processor["name"] for processor in processors]
+    choices = current_app.processors.names()
     form.processor.choices = choices
 
     if request.method == 'POST':
         processor_name = request.form.get("processor")
-        for p in processors:
-            if(p['name'] == processor_name):
-                processor = p
+        processor = current_app.processors.get(processor_name)
+        if not processor:
+            flash('Unknown processor', category="danger")
+            return redirect(url_for(".job_creator"))
         
         # check if the post request has the file part
         if 'file' not in request.files:
             flash('No file part', category="danger")
             return redirect(url_for(".job_creator"))
         
-        file = request.files['file']
-
         # If the user does not select a file, the browser submits an
         # empty file without a filename.
-        if file.filename == '':
+        uploads = [upload for upload in request.files.getlist('file') if upload.filename]
+        if not uploads:
             flash('No selected file', category="danger")
             return redirect(url_for(".job_creator"))
 
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            f_path = session["file_path"] + '/tmp/' + str(filename)
-            file.save(f_path)
-            with open(f_path) as f:
-                instructions = f.read().splitlines()
-            session["processor"] = processor
+        # uploads are parsed in memory, nothing is written to the user folder
+        max_file_bytes = current_app.config["UPLOAD_MAX_FILE_BYTES"]
+        if len(uploads) == 1 and allowed_file(uploads[0].filename):
+            # a single circuit goes through the preview page
+            try:
+                instructions = parse_qasm(uploads[0].stream.read(max_file_bytes + 1), max_file_bytes)
+            except InvalidCircuit as error:
+                flash("{}: {}".format(uploads[0].filename, error), category="danger")
+                return redirect(url_for(".job_creator"))
+            session["processor"] = dict(processor)
             session["instruction"] = instructions
 
             return redirect(url_for(".preview"))
-        
-        else:
-            flash("Not an allowed file", category="danger")
+
+        circuits, errors = read_uploads(uploads, max_file_bytes,
+                                        current_app.config["UPLOAD_MAX_BYTES"],
+                                        current_app.config["UPLOAD_MAX_FILES"])
+        jobs, invalid = build_jobs(current_user()._id, processor, circuits, max_file_bytes)
+        errors += invalid
+        jobs, over_quota = submit_within_quota(current_app.db, current_app.scheduler, jobs,
+                                               is_admin=bool(session.get("is_admin")))
+        errors += over_quota
+        if jobs:
+            flash("{} jobs have been submitted".format(len(jobs)), "success")
+        if errors:
+            # the errors of the single files are listed by the template
+            flash("{} files could not be submitted".format(len(errors)), category="danger")
+        return render_template("application/job_creator.html",
+                                choices=choices,
+                                form=form,
+                                submitted=[(name, url_for(".openjob", _jobID=job._id)) for name, job in jobs],
+                                upload_errors=errors,
+                                title="SaxonQ -- Job Creator")
     return render_template("application/job_creator.html",
                             choices=choices,
                             form=form,
@@ -362,12 +396,9 @@ def preview():
         if(str("\n".join(session["instruction"])).find("measure") == -1):
             flash("A job needs to have at least one measure instruction", category="danger")
             return redirect(url_for(".job_creator"))
-        transpile = QASM_Pulse_Transpiler(session["instruction"])
-        transpile.extract_instructions()
-        instructions_pulse = transpile.instruction.splitlines()
+        instructions_pulse = pulse_instructions(session["instruction"])
     
-        user_data = current_app.db.user.find_one({"email": session["email"]})
-        user = User(**user_data)
+        user = current_user()
         job = Experiment(_id=uuid.uuid4().hex,
                         user_id=user._id,
                         processor=session["processor"],
@@ -376,26 +407,20 @@ def preview():
                         instructions=session["instruction"],
                         instructions_pulse=instructions_pulse,
                         date = datetime.datetime.today())
-        current_app.db.open_jobs.insert_one(asdict(job))
+        submit_job(job)
         
         flash("Job has been submitted", "success")
         job_url = url_for(".openjob",_jobID=job._id, _external=True)
         html = render_template("notifications/notification_job_submitted.html", job_url=job_url)
         subject = "SaxonQ: You submitted a job"
         if not session.get("is_admin"):
-            email.send_message(user.email, subject, html)
+            outbox.send_message(user.email, subject, html)
         return redirect(url_for(".job_creator"))
     
-    transpile = QASM_transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_verbose = transpile.instruction.splitlines()
+    instructions_verbose = verbose_instructions(session["instruction"])
     instro = str("\n".join(session["instruction"]))
     session["QASM"] = instro    
-    circuit = QuantumCircuit.from_qasm_str(instro)
-    image = circuit.draw(output='mpl')
-    f_path = session["file_path"] + '/tmp/' + "figure.svg"
-    image.savefig(f_path)
-    svg = open(f_path).read()
+    svg = circuit_svg(instro)
     return render_template("application/preview.html",
                            processor=session["processor"],
                            instructions=session["instruction"],
@@ -406,34 +431,77 @@ def preview():
 @pages.route("/download")
 @login_required
 def download_QASM():
-    if(session["QASM"]):
+    qasm = session["QASM"]
+    if not qasm:
+        circuit = circuit_editor().load()
+        if circuit and circuit["gates"]:
+            qasm = CircuitEditor.qasm(circuit)
+    if(qasm):
         f_path = session["file_path"]+'/tmp/OpenQASM_file_'+str(datetime.datetime.today())+'.qasm'
         with open(f_path, "w") as f:
-            f.write(session["QASM"])
+            f.write(qasm)
         return send_file(f_path, as_attachment=True)
         
     flash("Please create an OpenQASM file first", category="danger")
     return redirect(url_for(".preview"))
 
+def circuit_editor():
+    return CircuitEditor(current_app.db.circuits, current_user()._id)
+
+def circuit_fits(circuit, processor):
+    """Whether the creator's ``circuit`` was made for ``processor`` at its current size."""
+    return (circuit["processor"] == processor["name"]
+            and circuit["num_qubits"] == processor["number of qubits"])
+
+def editor_circuit(editor, processor):
+    """Circuit of the creator; a program handed over in session["QASM"] (e.g. by the preview) replaces it.
+
+    A circuit made for another processor, or for another size of it, is
+    started again, since the processor can be changed on several pages.
+    """
+    circuit = editor.load()
+    if session.get("QASM"):
+        lines = session["QASM"].splitlines()
+        if circuit is None or CircuitEditor.lines(circuit) != [line for line in lines if line.strip()]:
+            circuit = editor.create(processor["number of qubits"], processor["name"], lines)
+        session["QASM"] = False
+    elif circuit is not None and not circuit_fits(circuit, processor):
+        circuit = editor.create(processor["number of qubits"], processor["name"])
+    return circuit
+
+def render_circuit_creator(circuit, qubits):
+    if circuit is None or not circuit["gates"]:
+        return render_template("application/circuit_creator.html", 
+                        choices_operations=operations.get_operations(),
+                        choices_target=qubits,
+                        choices_control=qubits,
+                        lines=CircuitEditor.lines(circuit) if circuit else None,
+                        title="SaxonQ -- Circuit Creator")
+    # drawings are cached by the artifact store
+    svg = circuit_svg(CircuitEditor.qasm(circuit))
+    return render_template("application/circuit_creator.html", 
+                        choices_operations=operations.get_operations(),
+                        choices_target=qubits,
+                        choices_control=qubits,
+                        figure = Markup(svg),
+                        lines=CircuitEditor.lines(circuit),
+                        title="SaxonQ -- Circuit Creator")
+
 @pages.route("/circuit_creator", methods=["GET", "POST"])
 @login_required
 def circuit_creator():
-    for p in available_processors:
-        if(p["name"] == session["processor"]["name"]):
-            processor = p
+    processor = current_app.processors.get(session["processor"]["name"])
+    if not processor:
+        return redirect(url_for(".choose_processor"))
 
     session["num_qbits"] = processor["number of qubits"]
     session["num_cbits"] = session['num_qbits']
     qubits  = ["q["+str(i)+"]" for i in range(session["num_qbits"])]
+    editor = circuit_editor()
+    circuit = editor_circuit(editor, processor)
     if request.method == "POST":
-        if not session['QASM']:
-            session['QASM'] = "OPENQASM 2.0;\ninclude "+ '"'+"qelib1.inc"+'"' + ";\n"
-            session['QASM'] += "qreg q["+str(session["num_qbits"])+'];\n'
-            session["QASM"] += "creg c["+str(session["num_qbits"])+'];\n'
-        for p in available_processors:
-            if(p["name"] == session["processor"]["name"]):
-                processor = p 
-
+        if circuit is None:
+            circuit = editor.create(processor["number of qubits"], processor["name"])
         o = request.form.get("operation")
         t = request.form.get("target")
         c = request.form.get("control")
@@ -443,88 +511,73 @@ def circuit_creator():
                                                       control=c,
                                                       rotation=a)
         if(instruction.find("Error") == -1):
-            session["QASM"] += instruction + '\n'
-            circuit = QuantumCircuit.from_qasm_str(session["QASM"])
-            image = circuit.draw(output='mpl')
-            f_path = session["file_path"] + '/tmp/' + "figure.svg"
-            image.savefig(f_path)
-            svg = open(f_path).read()
+            circuit = editor.append(instruction) or circuit
         else:
-            svg = False
             flash(instruction, category="danger")        
-        return render_template("application/circuit_creator.html", 
-                                figure = Markup(svg),
-                                choices_operations=operations.get_operations(),
-                                choices_target=qubits,
-                                choices_control=qubits,
-                                lines=session["QASM"].splitlines(),
-                                title="SaxonQ -- Circuit Creator")
-    if(session["QASM"]):
-        circuit = QuantumCircuit.from_qasm_str(session["QASM"])
-        image = circuit.draw(output='mpl')
-        f_path = session["file_path"] + '/tmp/' + "figure.svg"
-        image.savefig(f_path)
-        svg = open(f_path).read()
-        return render_template("application/circuit_creator.html", 
-                            choices_operations=operations.get_operations(),
-                            choices_target=qubits,
-                            choices_control=qubits,
-                            figure = Markup(svg),
-                            lines=session["QASM"].splitlines(),
-                            title="SaxonQ -- Circuit Creator")
-    return render_template("application/circuit_creator.html", 
-                    choices_operations=operations.get_operations(),
-                    choices_target=qubits,
-                    choices_control=qubits,
-                    title="SaxonQ -- Circuit Creator")
+    return render_circuit_creator(circuit, qubits)
+
+@pages.route("/circuit_creator/undo")
+@login_required
+def undo_circuit():
+    if circuit_editor().undo() is None:
+        flash("Nothing to undo", category="danger")
+    return redirect(url_for(".circuit_creator"))
 
 
 @pages.route("/circuit_creator/clear_circuit")
 @login_required
 def clear_circuit():
     session["QASM"] = False
+    circuit_editor().clear()
     return redirect(url_for('.circuit_creator'))
 
 @pages.route("/circuit_creator/choose_processor", methods=["GET", "POST"])
 @login_required
 def choose_processor():
     session["QASM"] = False
+    circuit_editor().clear()
     if request.method == "POST":
         processor_name = request.form.get("processor")
-        for p in available_processors:
-            if(p["name"] == processor_name):
-                session["processor"] = p
+        processor = current_app.processors.get(processor_name)
+        if processor:
+            session["processor"] = dict(processor)
                     
         return redirect(url_for(".circuit_creator"))
-    processors = available_processors
+    processors = current_app.processors.all()
     choices = [processor["name"] for processor in processors]
     return render_template("application/choose_processor.html",
-                            processors=available_processors,
+                            processors=processors,
                             choices=choices,
                             title="SaxonQ -- Choose Processor")
 
 @pages.route("/circuit_creator/delete_line/<string:num>")
 @login_required
 def delete_line(num: int):
-    if(int(num) < 5):
+    editor = circuit_editor()
+    circuit = editor.load()
+    # line numbers start at 1 and include the header
+    index = int(num) - 1 - (len(circuit["header"]) if circuit else 0)
+    gate = editor.gate_at(index) if circuit else None
+    if gate is None:
         flash("This line can not be deleted", category="danger")
         return redirect(url_for(".circuit_creator"))    
-    code = ''
-    old_code = session["QASM"].splitlines()
-    for i, line in enumerate(old_code):
-        if(i+1 != int(num)):
-            code += line + '\n'
-    session["QASM"] = code
+    editor.delete(gate["id"])
     return redirect(url_for(".circuit_creator"))
 
 @pages.route("/circuit_creator/make_OpenQASM_file")
 @login_required
 def make_QASM_file():
-    if(session["QASM"]):
-        if(session["QASM"].find("measure") == -1):
+    circuit = circuit_editor().load()
+    processor = current_app.processors.get(session["processor"]["name"]) if session.get("processor") else None
+    if circuit and processor and not circuit_fits(circuit, processor):
+        # made for another processor, the creator starts a new circuit
+        return redirect(url_for(".circuit_creator"))
+    if(circuit and circuit["gates"]):
+        lines = CircuitEditor.lines(circuit)
+        if not has_measurement(lines):
             flash("A job needs to have at least one measure instruction", category="danger")
             return redirect(url_for(".circuit_creator"))
-        session["instruction"] = session["QASM"].splitlines()
+        session["instruction"] = lines
         return redirect(url_for(".preview"))
     flash("Please create a quantum circuit", category="danger")
     return redirect(url_for(".circuit_creator"))
@@ -532,12 +585,11 @@ def make_QASM_file():
 @pages.route("/processors")
 @login_required
 def processors():
-    processors = available_processors
-    for i, p in enumerate(processors):
-        jobs_in_line = current_app.db.open_jobs.find({"processor.name": p["name"]})
-        processors[i]["jobs_in_line"] = int(10*np.random.random()) + 5
-        for job in jobs_in_line:
-            processors[i]["jobs_in_line"] += 1 
+    depths = current_app.queue_depth.table(current_app.db)
+    waits = pending_seconds(current_app.db)
+    processors = [dict(p, jobs_in_line=depths.get(p["name"], 0),
+                       estimated_wait=format_duration(waits.get(p["name"], 0)))
+                  for p in current_app.processors.all()]
     return render_template("application/processors.html", 
                            processors=processors,
                            title="SaxonQ -- Processors")
@@ -550,44 +602,25 @@ def QASM_instruction():
 @pages.route("/inspector")
 @login_required
 def job_inspector():
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
-    if(user.is_admin):
-        # open jobs
-        ojobs = current_app.db.open_jobs.find()
-        open_jobs = []
-        for job in ojobs:
-            experiment = Experiment(**job)
-            open_jobs.append(experiment)
-        
-        # processed jobs
-        pjobs = current_app.db.processed_jobs.find()
-        processed_jobs = []
-        for job in pjobs:
-            result = Result(**job)
-            processed_jobs.append(result)
-        return render_template("application/job_inspector.html", 
-                           open_jobs=open_jobs,
-                           processed_jobs=processed_jobs,
-                           title="SaxonQ -- Job Inspector")
-    
-    # open jobs
-    ojobs = current_app.db.open_jobs.find({"user_id": user._id})
-    open_jobs = []
-    for job in ojobs:
-        experiment = Experiment(**job)
-        open_jobs.append(experiment)
-    
-    # processed jobs
-    pjobs = current_app.db.processed_jobs.find({"user_id": user._id})
-    processed_jobs = []
-    for job in pjobs:
-        result = Result(**job)
-        processed_jobs.append(result)
+    user = current_user()
+    # admins see the jobs of all users
+    query = {} if user.is_admin else {"user_id": user._id}
+    size = current_app.config["JOB_PAGE_SIZE"]
+    try:
+        open_jobs, open_next = open_jobs_page(current_app.db, query,
+                                              after=request.args.get("open_after"),
+                                              size=size)
+        processed_jobs, processed_next = processed_jobs_page(current_app.db, query,
+                                                             after=request.args.get("processed_after"),
+                                                             size=size)
+    except ValueError:
+        abort(400)
 
     return render_template("application/job_inspector.html", 
                            open_jobs=open_jobs,
                            processed_jobs=processed_jobs,
+                           open_next=open_next,
+                           processed_next=processed_next,
                            title="SaxonQ -- Job Inspector")
 
 
@@ -595,64 +628,95 @@ def job_inspector():
 @login_required
 def openjob(_jobID: str):
     job_data = current_app.db.open_jobs.find_one({"_id": _jobID})
+    running = None
+    if not job_data:
+        running = current_app.db.running_jobs.find_one({"_id": _jobID})
+        if running:
+            flash("Your job is being processed right now", category="success")
+            job_data = running["job"]
     if not job_data:
         job_data = current_app.db.processed_jobs.find_one({"open_id": _jobID})
         if not job_data:
             abort(404)
         else:
             flash("Your job has already been processed", category="success")
-            job = asdict(Result(**job_data))
+            job = asdict(load_document(Result, job_data))
             return redirect(url_for(".processedjob",_jobID=job["_id"]))
-    job = asdict(Experiment(**job_data))
+    job = asdict(load_document(Experiment, job_data))
     job["date"] = "{} at {} (CET)".format(job["date"].strftime("%d %B %Y"),
                                           job["date"].strftime("%H:%M:%S "))
-    transpile = QASM_transpiler(job["instructions"])
-    transpile.extract_instructions()
-    instructions_verbose = transpile.instruction.splitlines()
-    job["instructions_verbose"] = instructions_verbose
+    job["instructions_verbose"] = stored_verbose(job_data)
     
-    jobs_in_line = current_app.db.open_jobs.find({"processor.name": job["processor"]["name"]})
-    job["jobs in line"] = int(10*np.random.random()) + 5
-    for i in jobs_in_line:
-        job["jobs in line"] += 1
+    depth = current_app.queue_depth.depth(current_app.db, job["processor"]["name"])
+    job["jobs in line"] = max(depth - 1, 0)
+    job["estimated wait"] = format_duration(wait_seconds(current_app.db, job_data,
+                                                         running=running is not None))
     instro = str("\n".join(job["instructions"]))
-    circuit = QuantumCircuit.from_qasm_str(instro)
-    image = circuit.draw(output='mpl')
-    f_path = session["file_path"] + '/tmp/' + "figure.svg"
-    image.savefig(f_path)
-    svg = open(f_path).read()
+    svg = circuit_svg(instro)
     category_text = CategoryText(status='open', category=job['category'], params=job['params'])
     return render_template("application/open_job.html", 
                            job = job, 
                            figure = Markup(svg),
+                           status_stream = current_app.config["JOB_STATUS_STREAM"],
+                           status_url = url_for(".job_status_events" if current_app.config["JOB_STATUS_STREAM"]
+                                                else ".job_status_poll", _jobID=_jobID),
                            category_text = category_text, 
                            title="SaxonQ -- Open Job")
 
+def owned_job_status(_jobID):
+    current = job_status.get(current_app.db, _jobID)
+    user = current_user()
+    if current is None or (current.get("user_id") != user._id and not user.is_admin):
+        abort(404)
+    return current
+
+def job_status_data(current):
+    data = job_status.public(current)
+    if data.get("result_id"):
+        data["result_url"] = url_for(".processedjob", _jobID=data["result_id"])
+    return data
+
+@pages.route("/job_inspector/job_status/<string:_jobID>")
+@login_required
+def job_status_poll(_jobID: str):
+    # long poll: pass the last seen status as `known` to wait for the next one
+    current = owned_job_status(_jobID)
+    known = request.args.get("known")
+    if known == current["status"] and known not in job_status.FINAL:
+        current = job_status.wait(current_app.db, _jobID, known,
+                                  timeout=current_app.config["JOB_STATUS_TIMEOUT"],
+                                  interval=current_app.config["JOB_STATUS_INTERVAL"]) or current
+    return jsonify(job_status_data(current))
+
+@pages.route("/job_inspector/job_status/<string:_jobID>/events")
+@login_required
+def job_status_events(_jobID: str):
+    if not current_app.config["JOB_STATUS_STREAM"]:
+        abort(404)
+    owned_job_status(_jobID)
+    db = current_app.db
+    events = job_status.events(db, _jobID, present=job_status_data,
+                               timeout=current_app.config["JOB_STATUS_STREAM_TIMEOUT"],
+                               interval=current_app.config["JOB_STATUS_INTERVAL"])
+    return Response(stream_with_context(events),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @pages.route("/job_inspector/processed_job/<string:_jobID>")
 @login_required
 def processedjob(_jobID: str):
     job_data = current_app.db.processed_jobs.find_one({"_id": _jobID})
     if not job_data:
         abort(404)    
-    job = asdict(Result(**job_data))
+    job = asdict(load_document(Result, job_data))
     job["date_submit"] = "{} at {} (CET)".format(job["date_submit"].strftime("%d %B %Y"),
                                           job["date_submit"].strftime("%H:%M:%S "))
     job["date_finish"] = "{} at {} (CET)".format(job["date_finish"].strftime("%d %B %Y"),
                                           job["date_finish"].strftime("%H:%M:%S "))
-    transpile = QASM_transpiler(job["instructions"])
-    transpile.extract_instructions()
-    instructions_verbose = transpile.instruction.splitlines()
-    job["instructions_verbose"] = instructions_verbose
+    job["instructions_verbose"] = stored_verbose(job_data)
     instro = str("\n".join(job["instructions"]))
-    image = plot_histogram(job["result"])
-    f_path = session["file_path"] + '/tmp/' + "histogram.svg"
-    image.savefig(f_path, bbox_inches="tight")
-    svg_histogram = open(f_path).read()
-    circuit = QuantumCircuit.from_qasm_str(instro)
-    image = circuit.draw(output='mpl')
-    f_path = session["file_path"] + '/tmp/' + "circuit.svg"
-    image.savefig(f_path)
-    svg_circuit = open(f_path).read()
+    svg_histogram = histogram_svg(job["result"])
+    svg_circuit = circuit_svg(instro)
     category_text = CategoryText(status='processed', 
                                  category=job['category'], 
                                  results=job['result'] , 
@@ -715,7 +779,7 @@ def register():
         confirm_url = url_for(".confirm_email", token=token, _external=True)
         html = render_template("user_management/confirm_email.html", confirm_url=confirm_url)
         subject = "Please confirm your email"
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
         flash("A confirmation email has been sent to you.", "success")
         return redirect(url_for("pages.inactive"))
 
@@ -726,8 +790,7 @@ def register():
 @pages.route("/confirm/<token>")
 @login_required
 def confirm_email(token):
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user(fresh=True)
     if user.is_confirmed:
         flash("Account already confirmed.", "success")
         return redirect(url_for(".login"))
@@ -735,6 +798,7 @@ def confirm_email(token):
     
     if user.email == email:
         current_app.db.user.update_one({"_id": user._id}, {"$set": {"is_confirmed": True}})
+        invalidate_user(user.email)
         flash("You have confirmed your account. Thanks!", "success")
     else:
         flash("The confirmation link is invalid or has expired.", "danger")
@@ -743,11 +807,10 @@ def confirm_email(token):
 @pages.route("/redirect_to_varify")
 @login_required
 def verify_account():
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    if not user_data:
+    user = current_user(fresh=True)
+    if not user:
         flash("Login credentials not correct", category="danger")
         return redirect(url_for(".login"))
-    user = User(**user_data)
     if user.is_confirmed:
         # return redirect(url_for(".home"))
         next_page = session.get('next_page')
@@ -764,8 +827,7 @@ def verify_account():
 @pages.route("/resend")
 @login_required
 def resend_confirmation():
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user(fresh=True)
     if user.is_confirmed:
         flash("Your account has already been confirmed.", "success")
         return redirect(url_for("pages.home"))
@@ -774,15 +836,14 @@ def resend_confirmation():
     html = render_template("user_management/confirm_email.html", confirm_url=confirm_url)
     subject = "Please confirm your email"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     flash("A new confirmation email has been sent.", "success")
     return redirect(url_for(".inactive"))
 
 @pages.route("/inactive")
 @login_required
 def inactive():
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user(fresh=True)
     if user.is_confirmed:
         return redirect(url_for(".home"))
     return render_template("user_management/inactive.html")
@@ -795,13 +856,15 @@ def login():
     form = LoginForm()
 
     if form.validate_on_submit():
-        user_data = current_app.db.user.find_one({"email": form.email.data})
-        if not user_data:
+        user = get_user_by_email(form.email.data, fresh=True)
+        if not user:
             flash("Login credentials not correct", category="danger")
             return redirect(url_for(".login"))
-        user = User(**user_data)
 
         if user and pbkdf2_sha256.verify(form.password.data, user.password):
+            # a new session id at login, so an id known before the login is worthless
+            if hasattr(session, "regenerate"):
+                session.regenerate()
             session["email"] = user.email
             session["file_path"] = os.getcwd() + '/' + str(UPLOAD_PATH) + str(user._id)
             session["is_admin"] = user.is_admin
@@ -849,7 +912,7 @@ def Superposition():
 @pages.route("/QuantumComputingLearning/Superposition_creation")
 def Superposition_creation():
     ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
+    session['processor'] = dict(current_app.processors.random())
     n = session['processor']['number of qubits']
     qc = QuantumCircuit(n,n)
     qc.h(range(n))
@@ -858,11 +921,8 @@ def Superposition_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    instructions_pulse = pulse_instructions(session["instruction"])
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     category="Superposition",
@@ -871,13 +931,13 @@ def Superposition_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     flash(f"Job has been submitted \n You created a superposition of all possible states", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_superposition_job_submitted.html", job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -888,14 +948,8 @@ def SWAP():
 @login_required
 @pages.route("/QuantumComputingLearning/SWAP_creation")
 def SWAP_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-    
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 1):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(2)
     n = session['processor']['number of qubits']
     if n < 2:
         flash("Our system has no available processor with enough qubits at the moment. Please try again later", "danger")
@@ -915,12 +969,9 @@ def SWAP_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     category="SWAP",
@@ -929,13 +980,13 @@ def SWAP_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     flash(f"Job has been submitted \n You transferred the one from the first qubit into the last qubit", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_SWAP_job_submitted.html", job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -946,14 +997,8 @@ def QuantumTeleport():
 @login_required
 @pages.route("/QuantumComputingLearning/Teleportation_creation")
 def Teleportation_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     
     n = session['processor']['number of qubits']
     if n < 3:
@@ -981,12 +1026,9 @@ def Teleportation_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     processor=session["processor"],
@@ -995,7 +1037,7 @@ def Teleportation_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     r_angle_string = f"{(r_angle/(np.pi)):.3f}" + unicodedata.lookup("GREEK SMALL LETTER PI")
     
     flash(f"Job has been submitted \n You created the state R_x({r_angle_string})|0> and teleported it", "success")
@@ -1003,7 +1045,7 @@ def Teleportation_creation():
     html = render_template("notifications/notification_Teleport_job_submitted.html", angle=r_angle, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1014,14 +1056,8 @@ def BellStates():
 @login_required
 @pages.route("/QuantumComputingLearning/Bell_States_creation")
 def BellStates_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 1):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(2)
     
     n = session['processor']['number of qubits']
     if n < 2:
@@ -1046,12 +1082,9 @@ def BellStates_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     BS_string = ""
     for s in BS_code[::-1]:
         BS_string += str(s)
@@ -1064,14 +1097,14 @@ def BellStates_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n You created the Bell state {BS_string}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_BellStates_job_submitted.html", BS=BS_string, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1082,14 +1115,8 @@ def GHZStates():
 @login_required
 @pages.route("/QuantumComputingLearning/GHZ_States_creation")
 def GHZStates_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     n = session['processor']['number of qubits']
     if n < 3:
         flash("Our system has no available processor with enough qubits at the moment. Please try again later", "danger")
@@ -1115,12 +1142,9 @@ def GHZStates_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     GHZ_string = ""
     for s in GHZ_code[::-1]:
         GHZ_string += str(s)
@@ -1133,7 +1157,7 @@ def GHZStates_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     GHZ_string = ""
     for s in GHZ_code[::-1]:
@@ -1144,7 +1168,7 @@ def GHZStates_creation():
     html = render_template("notifications/notification_GHZ_job_submitted.html", GHZ=GHZ_string, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1155,14 +1179,8 @@ def Deutsch():
 login_required
 @pages.route("/QuantumComputingLearning/Deutsch_algorithm_create")
 def Deutsch_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 1):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(2)
     
     n = session['processor']['number of qubits']
     if n < 2:
@@ -1193,12 +1211,9 @@ def Deutsch_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     processor=session["processor"],
@@ -1207,14 +1222,14 @@ def Deutsch_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your oracle is {s}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_Deutsch_job_submitted.html", oracle = s, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1225,14 +1240,8 @@ def DeutschJosza():
 @login_required
 @pages.route("/QuantumComputingLearning/Deutsch_Josza_algorithm_create")
 def DeutschJosza_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     
     n = session['processor']['number of qubits']
     if n < 3:
@@ -1262,12 +1271,9 @@ def DeutschJosza_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     processor=session["processor"],
@@ -1276,14 +1282,14 @@ def DeutschJosza_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your oracle is {s}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_Deutsch_Josza_job_submitted.html", oracle = s, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1294,15 +1300,8 @@ def QFT():
 @login_required
 @pages.route("/QuantumComputingLearning/Quantum_Fourier_Tranformation_create")
 def QFT_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-    n = session['processor']['number of qubits']
-
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     n = session['processor']['number of qubits']
     if n < 2:
         flash("Our system has no available processor with enough qubits at the moment. Please try again later", "danger")
@@ -1319,18 +1318,15 @@ def QFT_creation():
             angles[i] += -2*np.pi*int(k[l])/2**(j-l)
     for i in range(n):
         qc.rz(angles[i],i)
-    qc = QuantumCircuit.compose(qc, QFT_circuit(n))
+    qc = QuantumCircuit.compose(qc, templates.qft(n))
     qc.measure(range(n), range(n))
     
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     processor=session["processor"],
@@ -1339,14 +1335,14 @@ def QFT_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your state has a period of {k}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_QFT_job_submitted.html", period = k, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1357,14 +1353,8 @@ def BV():
 @login_required
 @pages.route("/QuantumComputingLearning/BV_code_creation")
 def BV_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-    
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     n = session['processor']['number of qubits']
     if n < 2:
         flash("Our system has no available processor with enough qubits at the moment. Please try again later", "danger")
@@ -1385,7 +1375,7 @@ def BV_creation():
     qc.h(range(n+1))
     
     # associate BV oracle
-    qc = QuantumCircuit.compose(qc, BV_oracle(BV_code))
+    qc = QuantumCircuit.compose(qc, templates.bv_oracle(BV_code))
     
     # revert to computational basis for readout
     qc.h(range(n+1))
@@ -1394,12 +1384,9 @@ def BV_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     BV_string = ''
     for s in BV_code[::-1]:
         if(s == 0):
@@ -1414,14 +1401,14 @@ def BV_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your code was {BV_string}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_BV_job_submitted.html", BV_code = BV_string, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1432,14 +1419,8 @@ def Simon():
 @login_required
 @pages.route("/QuantumComputingLearning/Simons_algorithm_creation")
 def Simon_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-    
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     n = session['processor']['number of qubits']
     if n < 2:
         flash("Our system has no available processor with enough qubits at the moment. Please try again later", "danger")
@@ -1462,7 +1443,7 @@ def Simon_creation():
     qc.h(range(l))
 
     # Simon oracle
-    qc = QuantumCircuit.compose(qc, Simon_oracle(Simon_code))
+    qc = QuantumCircuit.compose(qc, templates.simon_oracle(Simon_code))
     
     qc.h(range(l))
     qc.measure(range(l),range(l))
@@ -1470,12 +1451,9 @@ def Simon_creation():
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     Simon_string = ''
     for s in Simon_code[::-1]:
         if(s == '0'):
@@ -1490,14 +1468,14 @@ def Simon_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your code was {Simon_string}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_Simon_job_submitted.html", Simon_code = Simon_string, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 
@@ -1509,14 +1487,8 @@ def Grover():
 @login_required
 @pages.route("/QuantumComputingLearning/Grover_algorithm_creation")
 def Grover_creation():
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-    
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] > 2):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(3)
     n = session['processor']['number of qubits']
 
     if n < 2:
@@ -1524,72 +1496,18 @@ def Grover_creation():
         return redirect(url_for(".QClearning"))
     
     omega = format(int(2**(n-1)*np.random.random()),'b').zfill(n-1)[::1]
-    qc = QuantumCircuit(n,n-1)
-
-    # set up the phase and uncomputaion circuits
-    phase = GroverPhaseOracle(n, omega)
-    inversion = GroverInversionOracle(n)
 
-    ## prepare quantum parallelism state
-    qc.h(range(n-1))
-    
-    # calculate number of times T Grover inversion has to be run
-    T = np.pi*np.sqrt(2**(n-1))/4
-    T_low = np.floor(T)
-    T_high= np.ceil(T)
-    if(abs(T-T_low) <= abs(T-T_high)):
-        T = int(T_low)-1
-    else:
-        T = int(T_high)-1
-    for _ in range(T):
-        qc = QuantumCircuit.compose(qc, phase)
-        qc = QuantumCircuit.compose(qc, inversion)
-    qc.h(range(n-1))
+    # number of times T the Grover iteration has to be run
+    T = grover_iterations(n, omega)
+    qc = grover_circuit(n, omega, T)
     qc.measure(range(n-1), range(n-1))
-    backend = Aer.get_backend('qasm_simulator')
-    ex = execute(qc, backend, shots=1000)
-    results = ex.result()
-    count = results.get_counts()
-    if(omega[::-1] == str(list(count.keys())[0])):
-        pass
-    else:
-        qc.clear()
-        qc.h(range(n-1))
-        T = T+1
-        for _ in range(T):
-            qc = QuantumCircuit.compose(qc, phase)
-            qc = QuantumCircuit.compose(qc, inversion)
-        qc.h(range(n-1))
-        qc.measure(range(n-1), range(n-1))
-        backend = Aer.get_backend('qasm_simulator')
-        ex = execute(qc, backend, shots=1000)
-        results = ex.result()
-        count = results.get_counts()
-        if(omega[::-1] == str(list(count.keys())[0])):
-            pass
-        else:
-            qc.clear()
-            qc.h(range(n-1))
-            T = T+1
-            for _ in range(T):
-                qc = QuantumCircuit.compose(qc, phase)
-                qc = QuantumCircuit.compose(qc, inversion)
-            qc.h(range(n-1))
-            qc.measure(range(n-1), range(n-1))
-            backend = Aer.get_backend('qasm_simulator')
-            ex = execute(qc, backend, shots=1000)
-            results = ex.result()
-            count = results.get_counts()
 
     ## submit job
     session["QASM"] = qc.qasm()
     session["instruction"] = session["QASM"].splitlines()
-    transpile = QASM_Pulse_Transpiler(session["instruction"])
-    transpile.extract_instructions()
-    instructions_pulse = transpile.instruction.splitlines()
+    instructions_pulse = pulse_instructions(session["instruction"])
     
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     Grover_string = ''
     for s in omega:
         Grover_string += s
@@ -1602,14 +1520,14 @@ def Grover_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your state was {Grover_string}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_Grover_job_submitted.html", Grover_state = Grover_string, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
 
 @login_required
@@ -1629,14 +1547,8 @@ def Shor_creation():
         a = 4
     n_q = len("{0:b}".format(N)) + 1
 
-    ## randomly select an available processor
-    session['processor'] = available_processors[int(np.random.random()*len(available_processors))]
-    
     ## select an available processor with enough qubits
-    for p in available_processors:
-        if(p["number of qubits"] >= n_q):
-            session['processor'] = p
-            break
+    session['processor'] = processor_with_qubits(n_q)
     n = session['processor']['number of qubits']
     
     if n < n_q:
@@ -1648,12 +1560,9 @@ def Shor_creation():
     session["QASM"] = qc.qasm()
     print(session["QASM"])
     session["instruction"] = session["QASM"].splitlines()
-    #transpile = QASM_Pulse_Transpiler(session["instruction"])
-    #transpile.extract_instructions()
-    #instructions_pulse = transpile.instruction.splitlines()
+    #instructions_pulse = pulse_instructions(session["instruction"])
     instructions_pulse = 'NOT YET WORKING'
-    user_data = current_app.db.user.find_one({"email": session["email"]})
-    user = User(**user_data)
+    user = current_user()
     job = Experiment(_id=uuid.uuid4().hex,
                     user_id=user._id,
                     processor=session["processor"],
@@ -1663,12 +1572,12 @@ def Shor_creation():
                     instructions=session["instruction"],
                     instructions_pulse=instructions_pulse,
                     date = datetime.datetime.today())
-    current_app.db.open_jobs.insert_one(asdict(job))
+    submit_job(job)
     
     flash(f"Job has been submitted \n Your number N was {N} and your random seed a was {a}", "success")
     job_url = url_for(".openjob",_jobID=job._id, _external=True)
     html = render_template("notifications/notification_Shor_job_submitted.html", N = N, a = a, job_url=job_url)
     subject = "SaxonQ: You submitted a job"
     if not session.get("is_admin"):
-        email.send_message(user.email, subject, html)
+        outbox.send_message(user.email, subject, html)
     return redirect(url_for(".QClearning"))
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Fair-share scheduler against mongomock.
+
+Run from the directory above the checkout: ``python -m pytest interface/tests``.
+"""
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from interface.libs.jobs.scheduler import Scheduler
+
+NOW = datetime.datetime(2024, 1, 1, 12)
+
+
+def open_job(job_id, user_id, processor_name, minutes_ago, cost=10, priority=0, share=1):
+    return {"_id": job_id,
+            "user_id": user_id,
+            "processor": {"name": processor_name},
+            "date": NOW - datetime.timedelta(minutes=minutes_ago),
+            "cost": cost,
+            "priority": priority,
+            "share": share,
+            "instructions": []}
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_candidates_are_the_oldest_job_of_every_user(db):
+    db.open_jobs.insert_many([open_job("a1", "alice", "Trick", 30),
+                              open_job("a2", "alice", "Trick", 20),
+                              open_job("b1", "bob", "Trick", 10),
+                              open_job("c1", "carol", "Tick", 60)])
+    heads = Scheduler().candidates(db, "Trick", NOW)
+    assert [(head["_id"], head["job_id"]) for head in heads] == [("alice", "a1"), ("bob", "b1")]
+
+
+def test_candidates_put_heavy_users_behind(db):
+    db.open_jobs.insert_many([open_job("a1", "alice", "Trick", 30),
+                              open_job("b1", "bob", "Trick", 10)])
+    db.scheduler_usage.insert_one({"_id": "alice", "usage": 60, "updated": NOW})
+    heads = Scheduler(usage_weight=60).candidates(db, "Trick", NOW)
+    assert [head["_id"] for head in heads] == ["bob", "alice"]
+
+
+def test_charge_decays_the_previous_usage(db):
+    scheduler = Scheduler(half_life=3600)
+    scheduler.charge(db, {"user_id": "alice", "cost": 10}, NOW)
+    scheduler.charge(db, {"user_id": "alice", "cost": 10}, NOW + datetime.timedelta(hours=1))
+    usage = scheduler.usage(db, ["alice"], NOW + datetime.timedelta(hours=1))
+    assert usage["alice"] == pytest.approx(15)
+
+
+def test_dispatch_many_takes_turns_between_queues(db):
+    db.open_jobs.insert_many([open_job("a1", "alice", "Trick", 30),
+                              open_job("a2", "alice", "Trick", 20),
+                              open_job("b1", "bob", "Tick", 10)])
+    jobs = Scheduler().dispatch_many(db, 2, "worker-1", ["Trick", "Tick"])
+    assert [job["_id"] for job in jobs] == ["a1", "b1"]
+    assert sorted(job["_id"] for job in db.running_jobs.find()) == ["a1", "b1"]
+    assert [job["_id"] for job in db.open_jobs.find()] == ["a2"]
+    assert db.scheduler_usage.find_one({"_id": "alice"})["usage"] == pytest.approx(10)
+
+
+def test_dispatch_many_stops_when_the_queues_are_empty(db):
+    db.open_jobs.insert_one(open_job("a1", "alice", "Trick", 30))
+    scheduler = Scheduler()
+    assert [job["_id"] for job in scheduler.dispatch_many(db, 4, "worker-1")] == ["a1"]
+    assert scheduler.dispatch_many(db, 4, "worker-1") == []
+
+
+def test_remaining_quota_counts_the_waiting_jobs(db):
+    db.open_jobs.insert_many([open_job("a1", "alice", "Trick", 30),
+                              open_job("a2", "alice", "Trick", 20),
+                              open_job("a3", "alice", "Tick", 10)])
+    scheduler = Scheduler(user_quota=3)
+    assert scheduler.remaining_quota(db, "alice", "Trick") == 1
+    assert scheduler.remaining_quota(db, "alice", "Trick", is_admin=True) is None
@@ -0,0 +1,59 @@
+"""Server-side sessions across requests.
+
+Run from the directory above the checkout: ``python -m pytest interface/tests``.
+"""
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from interface.libs.session.interface import ServerSideSessionInterface
+from interface.libs.session.store import FileSessionStore, MemorySessionStore
+
+
+def make_app(store):
+    app = flask.Flask(__name__)
+    app.secret_key = "test"
+    app.session_interface = ServerSideSessionInterface(store, lazy_keys=["QASM"])
+
+    @app.route("/set")
+    def set_values():
+        flask.session["email"] = "alice@example.org"
+        flask.session["QASM"] = "OPENQASM 2.0;"
+        return "ok"
+
+    @app.route("/login")
+    def login():
+        flask.session.regenerate()
+        return "ok"
+
+    @app.route("/get")
+    def get_values():
+        return flask.jsonify(email=flask.session.get("email"), qasm=flask.session.get("QASM"))
+
+    return app
+
+
+@pytest.fixture(params=["file", "memory"])
+def store(request, tmp_path):
+    if request.param == "file":
+        return FileSessionStore(str(tmp_path))
+    return MemorySessionStore()
+
+
+def test_session_round_trip(store):
+    client = make_app(store).test_client()
+    client.get("/set")
+    # the second and third request load the stored session
+    assert client.get("/get").get_json() == {"email": "alice@example.org", "qasm": "OPENQASM 2.0;"}
+    assert client.get("/get").get_json() == {"email": "alice@example.org", "qasm": "OPENQASM 2.0;"}
+
+
+def test_regenerate_moves_the_session_to_a_new_id(store):
+    client = make_app(store).test_client()
+    client.get("/set")
+    old = client.get_cookie("session").value
+    client.get("/login")
+    new = client.get_cookie("session").value
+    assert new != old
+    assert store.load(old) is None
+    assert client.get("/get").get_json() == {"email": "alice@example.org", "qasm": "OPENQASM 2.0;"}
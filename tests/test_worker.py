@@ -0,0 +1,60 @@
+"""Claiming and evaluating open jobs against mongomock.
+
+Run from the directory above the checkout: ``python -m pytest interface/tests``.
+"""
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from interface.libs.jobs.worker import claim_job, claim_jobs, evaluate_open_jobs
+
+
+def open_job(job_id, user_id="alice", processor_name="Trick"):
+    return {"_id": job_id,
+            "user_id": user_id,
+            "processor": {"name": processor_name},
+            "category": "manual",
+            "params": {"none": None},
+            "date": datetime.datetime(2024, 1, 1, 12),
+            "cost": 10,
+            "instructions": ["OPENQASM 2.0;", 'include "qelib1.inc";', "qreg q[1];", "creg c[1];",
+                             "measure q[0] -> c[0];"]}
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_a_job_is_claimed_once(db):
+    job_data = open_job("j1")
+    db.open_jobs.insert_one(job_data)
+    assert claim_job(db, job_data, "worker-1")
+    assert not claim_job(db, job_data, "admin")
+    assert db.open_jobs.count_documents({}) == 0
+    assert db.running_jobs.find_one({"_id": "j1"})["worker"] == "worker-1"
+    assert db.job_status.find_one({"_id": "j1"})["user_id"] == "alice"
+
+
+def test_evaluate_open_jobs_skips_jobs_claimed_by_a_worker(db):
+    # the admin evaluation and the worker must not both finish a job
+    job_data = open_job("j1")
+    db.open_jobs.insert_one(job_data)
+    claim_job(db, job_data, "worker-1")
+    assert evaluate_open_jobs(db, [job_data]) == ([], [])
+    assert db.processed_jobs.count_documents({}) == 0
+    assert db.running_jobs.find_one({"_id": "j1"})["worker"] == "worker-1"
+
+
+def test_claim_jobs_skips_taken_and_finished_jobs(db):
+    jobs = [open_job("j1"), open_job("j2"), open_job("j3")]
+    db.open_jobs.insert_many([dict(job_data) for job_data in jobs[:2]])
+    claim_job(db, jobs[0], "worker-1")
+    # j3 was finished by someone else and is no longer open
+    claimed = claim_jobs(db, jobs, "admin")
+    assert [job_data["_id"] for job_data in claimed] == ["j2"]
+    assert sorted(db.running_jobs.distinct("_id")) == ["j1", "j2"]
+    assert db.open_jobs.count_documents({}) == 0
+    assert db.job_status.find_one({"_id": "j2"})["status"] == "running"